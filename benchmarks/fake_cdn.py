@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Local fake font CDN for benchmarks.
+Serves Google- and Bunny-style CSS sheets, 1001fonts/GitHub-style ZIP
+archives and raw TTF/WOFF files, all generated deterministically from the
+request path. Latency, bandwidth and error rate can be injected.
+
+Upstream hosts map to path prefixes:
+    fonts.googleapis.com -> /google/...    fonts.bunny.net -> /bunny/...
+    www.1001fonts.com    -> /1001fonts/... github.com      -> /github/...
+    dl.dafont.com        -> /dafont/...    font files      -> /files/...
+
+GET /__stats returns request/byte counters as JSON, /__reset zeroes them.
+"""
+
+import io
+import re
+import sys
+import json
+import time
+import random
+import struct
+import zlib
+import zipfile
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+WRITE_CHUNK = 16 * 1024
+
+
+def _name_record(name_id, text):
+    return name_id, text.encode('utf-16-be')
+
+
+def build_sfnt(family, weight=400, italic=False, size=60 * 1024):
+    """Minimal valid TrueType file with name and OS/2 tables, padded to about size bytes"""
+    style = ('Bold ' if weight >= 700 else '') + ('Italic' if italic else '')
+    style = style.strip() or 'Regular'
+    records = [_name_record(1, family), _name_record(2, style),
+               _name_record(4, f"{family} {style}"), _name_record(6, f"{family}-{style}".replace(' ', ''))]
+
+    # name table, format 0, Windows Unicode BMP records
+    strings = b''
+    entries = b''
+    for name_id, data in records:
+        entries += struct.pack('>HHHHHH', 3, 1, 0x409, name_id, len(data), len(strings))
+        strings += data
+    name_table = struct.pack('>HHH', 0, len(records), 6 + 12 * len(records)) + entries + strings
+
+    # OS/2 version 4, only the fields readers care about are meaningful (usWeightClass at 4, fsSelection at 62)
+    fs_selection = (0x01 if italic else 0) | (0x20 if weight >= 700 else 0) | (0x40 if not italic and weight < 700 else 0)
+    os2_table = struct.pack('>HhHH', 4, 500, weight, 5) + b'\x00' * 54 + struct.pack('>H', fs_selection) + b'\x00' * 34
+
+    rng = random.Random(f"{family}-{weight}-{italic}")
+    padding = max(0, size - len(name_table) - len(os2_table) - 12 - 16 * 3)
+    glyf_table = bytes(rng.getrandbits(8) for _ in range(min(padding, 4096))) * (padding // 4096 + 1)
+    glyf_table = glyf_table[:padding]
+
+    tables = sorted([(b'OS/2', os2_table), (b'glyf', glyf_table), (b'name', name_table)])
+    return _assemble_sfnt(b'\x00\x01\x00\x00', tables)
+
+
+def _checksum(data):
+    data += b'\x00' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+
+def _assemble_sfnt(flavor, tables):
+    num_tables = len(tables)
+    entry_selector = max(0, num_tables.bit_length() - 1)
+    search_range = (1 << entry_selector) * 16
+    header = flavor + struct.pack('>HHHH', num_tables, search_range, entry_selector,
+                                  num_tables * 16 - search_range)
+    offset = 12 + 16 * num_tables
+    directory = b''
+    body = b''
+    for tag, data in tables:
+        directory += tag + struct.pack('>III', _checksum(data), offset + len(body), len(data))
+        body += data + b'\x00' * (-len(data) % 4)
+    return header + directory + body
+
+
+def build_woff(family, weight=400, italic=False, size=60 * 1024):
+    """WOFF 1.0 wrapping of build_sfnt, every table zlib-compressed"""
+    sfnt = build_sfnt(family, weight, italic, size)
+    num_tables = struct.unpack('>H', sfnt[4:6])[0]
+    entries = []
+    for index in range(num_tables):
+        tag, checksum, offset, length = struct.unpack('>4sIII', sfnt[12 + 16 * index:28 + 16 * index])
+        table = sfnt[offset:offset + length]
+        compressed = zlib.compress(table)
+        if len(compressed) >= length:
+            compressed = table
+        entries.append((tag, checksum, length, compressed))
+
+    offset = 44 + 20 * num_tables
+    directory = b''
+    body = b''
+    for tag, checksum, length, compressed in entries:
+        directory += tag + struct.pack('>IIII', offset + len(body), len(compressed), length, checksum)
+        body += compressed + b'\x00' * (-len(compressed) % 4)
+    total = offset + len(body)
+    header = b'wOFF' + sfnt[:4] + struct.pack('>IHHIHHIIIII', total, num_tables, 0, len(sfnt),
+                                              1, 0, 0, 0, 0, 0, 0)
+    return header + directory + body
+
+
+def build_zip(name, font_count=4, font_size=60 * 1024, junk_size=512 * 1024):
+    """Archive shaped like the 1001fonts / GitHub ones: fonts plus specimens, docs and a web kit"""
+    family = re.sub(r'[^A-Za-z0-9]+', ' ', name).strip().title() or 'Font'
+    buffer = io.BytesIO()
+    rng = random.Random(name)
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('readme.txt', f"{family} - synthetic benchmark font\n" * 20)
+        archive.writestr('license.pdf', bytes(rng.getrandbits(8) for _ in range(32 * 1024)))
+        archive.writestr('specimen.png', bytes(rng.getrandbits(8) for _ in range(junk_size)),
+                         compress_type=zipfile.ZIP_STORED)
+        weights = [400, 700, 300, 900, 500, 600, 200, 100]
+        for index in range(font_count):
+            weight = weights[index % len(weights)]
+            italic = index >= len(weights)
+            file_name = f"{family.replace(' ', '')}-{weight}{'Italic' if italic else ''}"
+            archive.writestr(f"ttf/{file_name}.ttf", build_sfnt(family, weight, italic, font_size))
+            archive.writestr(f"web/{file_name}.woff", build_woff(family, weight, italic, font_size))
+    return buffer.getvalue()
+
+
+def parse_family(query):
+    """('Roboto', [100, 300, 400]) from a Google css2 or Bunny css family parameter"""
+    value = (parse_qs(query).get('family') or ['Font'])[0]
+    family, _, spec = value.partition(':')
+    weights = [int(w) for w in re.findall(r'\b[1-9]00\b', spec)] or [400]
+    return family.replace('+', ' '), sorted(set(weights))
+
+
+def google_css(base_url, family, weights):
+    faces = []
+    for weight in weights:
+        file_url = f"{base_url}/files/{quote(family.replace(' ', ''))}-{weight}.ttf"
+        faces.append(f"@font-face {{\n  font-family: '{family}';\n  font-style: normal;\n"
+                     f"  font-weight: {weight};\n  src: url({file_url}) format('truetype');\n}}\n")
+    return ''.join(faces)
+
+
+def bunny_css(base_url, family, weights):
+    faces = []
+    for weight in weights:
+        for subset, unicode_range in (('cyrillic', 'U+0301,U+0400-045F'), ('latin', 'U+0000-00FF,U+0131')):
+            stem = f"{base_url}/files/{quote(family.replace(' ', ''))}-{subset}-{weight}"
+            faces.append(f"/* {subset} */\n@font-face {{\n  font-family: '{family}';\n  font-style: normal;\n"
+                         f"  font-weight: {weight};\n  src: url({stem}.woff2) format('woff2'), "
+                         f"url({stem}.woff) format('woff');\n  unicode-range: {unicode_range};\n}}\n")
+    return ''.join(faces)
+
+
+class FakeCDN:
+    def __init__(self, latency=0.0, bandwidth=0, error_rate=0.0, font_size=60 * 1024,
+                 zip_junk_size=512 * 1024, seed=1):
+        self.latency = latency
+        self.bandwidth = bandwidth  # Bytes per second per response, 0 = unlimited
+        self.error_rate = error_rate
+        self.font_size = font_size
+        self.zip_junk_size = zip_junk_size
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {'requests': 0, 'bytes_sent': 0, 'errors_injected': 0,
+                          'not_modified': 0, 'range_requests': 0}
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def should_fail(self):
+        with self._lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def body_for(self, base_url, path, query):
+        """(content, content_type) for a path, or None for 404"""
+        cache_key = (path, query)
+        with self._lock:
+            if cache_key in self._bodies:
+                return self._bodies[cache_key]
+
+        if path.startswith('/google/') and 'css' in path:
+            body = (google_css(base_url, *parse_family(query)).encode('utf-8'), 'text/css')
+        elif path.startswith('/bunny/') and 'css' in path:
+            body = (bunny_css(base_url, *parse_family(query)).encode('utf-8'), 'text/css')
+        elif path.startswith('/files/'):
+            name = path.rsplit('/', 1)[-1]
+            stem, _, ext = name.rpartition('.')
+            match = re.search(r'-(\d{3})$', stem)
+            weight = int(match.group(1)) if match else 400
+            family = stem.split('-', 1)[0]
+            if ext == 'ttf':
+                body = (build_sfnt(family, weight, False, self.font_size), 'font/ttf')
+            elif ext in ('woff', 'woff2'):
+                body = (build_woff(family, weight, False, self.font_size), f'font/{ext}')
+            else:
+                return None
+        elif path.startswith(('/1001fonts/', '/github/', '/dafont/')):
+            name = path.rsplit('/', 1)[-1] or query
+            body = (build_zip(name, font_size=self.font_size, junk_size=self.zip_junk_size), 'application/zip')
+        else:
+            return None
+
+        with self._lock:
+            self._bodies[cache_key] = body
+        return body
+
+
+class FakeCDNHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cdn = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def _send_json(self, data):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _respond(self, head):
+        parsed = urlparse(self.path)
+        if parsed.path == '/__stats':
+            return self._send_json(self.cdn.stats)
+        if parsed.path == '/__reset':
+            self.cdn.reset()
+            return self._send_json({'ok': True})
+
+        self.cdn.count('requests')
+        if self.cdn.latency:
+            time.sleep(self.cdn.latency)
+
+        if self.cdn.should_fail():
+            self.cdn.count('errors_injected')
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.send_header('Retry-After', '1')
+            self.end_headers()
+            return
+
+        body = self.cdn.body_for(self._base_url(), parsed.path, parsed.query)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content, content_type = body
+        etag = '"' + hashlib.sha1(content).hexdigest()[:16] + '"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.cdn.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        start, end = 0, len(content) - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and (not if_range or if_range == etag):
+            match = re.match(r'bytes=(\d*)-(\d*)$', range_header.strip())
+            if match:
+                if match.group(1):
+                    start = int(match.group(1))
+                    end = min(end, int(match.group(2))) if match.group(2) else end
+                else:
+                    start = max(0, len(content) - int(match.group(2)))
+                if start > end:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{len(content)}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 206
+                self.cdn.count('range_requests')
+
+        payload = content[start:end + 1]
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        self.end_headers()
+        if head:
+            return
+        self._write_throttled(payload)
+
+    def _write_throttled(self, payload):
+        bandwidth = self.cdn.bandwidth
+        for offset in range(0, len(payload), WRITE_CHUNK):
+            chunk = payload[offset:offset + WRITE_CHUNK]
+            self.wfile.write(chunk)
+            self.cdn.count('bytes_sent', len(chunk))
+            if bandwidth:
+                time.sleep(len(chunk) / float(bandwidth))
+
+
+def make_server(cdn, host='127.0.0.1', port=0):
+    handler = type('BoundFakeCDNHandler', (FakeCDNHandler,), {'cdn': cdn})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def rewrite_url(url, base_url):
+    """Point an upstream config.json URL at the fake CDN"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    prefixes = {
+        'fonts.googleapis.com': '/google',
+        'fonts.bunny.net': '/bunny',
+        'www.1001fonts.com': '/1001fonts',
+        'github.com': '/github',
+        'dl.dafont.com': '/dafont',
+    }
+    prefix = prefixes.get(host, '/' + host.replace('.', '_'))
+    path = parsed.path
+    if prefix == '/dafont':
+        path = '/' + (parse_qs(parsed.query).get('f') or ['font'])[0] + '.zip'
+    rewritten = f"{base_url}{prefix}{path}"
+    if parsed.query and prefix in ('/google', '/bunny'):
+        rewritten += '?' + parsed.query
+    return rewritten
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake font CDN for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each response")
+    parser.add_argument('--bandwidth', type=int, default=0, help="bytes/sec per response, 0 = unlimited")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('--font-size-kb', type=int, default=60)
+    parser.add_argument('--zip-junk-kb', type=int, default=512, help="size of the non-font payload in ZIPs")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    cdn = FakeCDN(args.latency, args.bandwidth, args.error_rate, args.font_size_kb * 1024,
+                  args.zip_junk_kb * 1024, args.seed)
+    server = make_server(cdn, args.host, args.port)
+
+    # The benchmark runner reads the port from this line
+    print(f"LISTENING http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark the full config.json workload against the local fake CDN.
+Each run happens in a fresh child process with its own downloads folder and
+cache (cold start), installing through the fake backend. Reports fonts/sec,
+wall time, bytes, requests and peak memory, saves the results as JSON and
+compares them with a previous run.
+
+    python benchmarks/run_benchmark.py --latency 0.05 --bandwidth 2000000 --runs 3
+    python benchmarks/run_benchmark.py --compare benchmarks/results/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import statistics
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Metric -> True if higher is better
+METRICS = {
+    'fonts_per_sec': True,
+    'wall_time': False,
+    'bytes_transferred': False,
+    'requests': False,
+    'peak_memory_mb': False,
+}
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def rewrite_config(base_url, config_path, include=None):
+    """config.json with every URL pointing at the fake CDN and the fake install backend"""
+    sys.path.insert(0, BENCH_DIR)
+    from fake_cdn import rewrite_url
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    fonts = {}
+    for font_key, font_config in config['fonts'].items():
+        if include and font_key not in include:
+            continue
+        font_config = dict(font_config)
+        font_config['urls'] = [rewrite_url(url, base_url) for url in font_config['urls']]
+        fonts[font_key] = font_config
+    config['fonts'] = fonts
+
+    download_config = dict(config.get('download', {}))
+    download_config['install_backend'] = 'fake'
+    config['download'] = download_config
+    return config
+
+
+def worker(workspace, jobs=None):
+    """One benchmark run in this process. Prints a JSON result line."""
+    sys.path.insert(0, REPO_DIR)
+    from contextlib import redirect_stdout
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        from main import FontDownloader
+        start = time.perf_counter()
+        app = FontDownloader(downloads_dir=os.path.join(workspace, 'downloaded_fonts'),
+                             config_path=os.path.join(workspace, 'config.json'), concurrency=jobs)
+        app.run_downloads()
+        wall_time = time.perf_counter() - start
+
+    result = {
+        'fonts': len(app.fonts),
+        'succeeded': app.success_count,
+        'failed': list(app.failed_font_keys),
+        'wall_time': round(wall_time, 3),
+        'fonts_per_sec': round(app.success_count / wall_time, 2) if wall_time else 0,
+        'client_requests': app._session.request_count if app._session else 0,
+        'installed': len(app.installer.installed) if app.installer else 0,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+    print(json.dumps(result))
+    return 0
+
+
+def start_cdn(args):
+    command = [sys.executable, os.path.join(BENCH_DIR, 'fake_cdn.py'),
+               '--latency', str(args.latency), '--bandwidth', str(args.bandwidth),
+               '--error-rate', str(args.error_rate), '--font-size-kb', str(args.font_size_kb),
+               '--zip-junk-kb', str(args.zip_junk_kb), '--seed', str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip()
+    if not line.startswith('LISTENING '):
+        process.kill()
+        raise RuntimeError(f"Fake CDN didn't start: {line!r}")
+    return process, line.split(' ', 1)[1]
+
+
+def cdn_call(base_url, path):
+    with urllib.request.urlopen(base_url + path, timeout=10) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def run_once(base_url, config, jobs=None, workspace=None):
+    """Run one benchmark in a child process. A given workspace is reused (warm cache)."""
+    owns_workspace = workspace is None
+    workspace = workspace or tempfile.mkdtemp(prefix='font-bench-')
+    try:
+        with open(os.path.join(workspace, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+        cdn_call(base_url, '/__reset')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', workspace]
+        if jobs:
+            command += ['--jobs', str(jobs)]
+        completed = subprocess.run(command, capture_output=True, text=True, cwd=workspace)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark run failed:\n{completed.stderr}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        server_stats = cdn_call(base_url, '/__stats')
+        result['requests'] = server_stats['requests']
+        result['bytes_transferred'] = server_stats['bytes_sent']
+        result['errors_injected'] = server_stats['errors_injected']
+        return result
+    finally:
+        if owns_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def summarize(runs):
+    """Median of each metric over the runs"""
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        summary[metric] = round(statistics.median(values), 3) if values else None
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_result(results_dir, params):
+    """Most recent saved result with the same workload parameters"""
+    try:
+        names = sorted(name for name in os.listdir(results_dir) if name.endswith('.json'))
+    except OSError:
+        return None
+    for name in reversed(names):
+        path = os.path.join(results_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get('params') == params:
+            return path
+    return None
+
+
+def compare(current, previous, threshold):
+    """Print metric deltas. Returns the metrics that got worse by more than threshold percent."""
+    regressions = []
+    print(f"\n{'metric':<20}{'previous':>14}{'current':>14}{'change':>10}")
+    for metric, higher_is_better in METRICS.items():
+        old = previous['summary'].get(metric)
+        new = current['summary'].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change < -threshold if higher_is_better else change > threshold
+        if worse:
+            regressions.append(metric)
+        print(f"{metric:<20}{old:>14}{new:>14}{change:>+9.1f}%{'  <-- regression' if worse else ''}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark font provisioning against a local fake CDN")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added before each response")
+    parser.add_argument('--bandwidth', type=int, default=0, help="bytes/sec per response, 0 = unlimited")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('--font-size-kb', type=int, default=60)
+    parser.add_argument('--zip-junk-kb', type=int, default=512)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--jobs', type=int, help="override download.concurrency")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--warm', action='store_true',
+                        help="reuse one workspace so runs after the first hit the cache/manifest")
+    parser.add_argument('--include', action='append', default=[], help="only these font keys")
+    parser.add_argument('--config', default=os.path.join(REPO_DIR, 'config.json'))
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--name', help="result file name (default: timestamp)")
+    parser.add_argument('--compare', help="result file to compare against (default: latest matching run)")
+    parser.add_argument('--threshold', type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.worker:
+        return worker(args.worker, args.jobs)
+
+    include = [key.strip() for value in args.include for key in value.split(',') if key.strip()]
+    params = {
+        'latency': args.latency, 'bandwidth': args.bandwidth, 'error_rate': args.error_rate,
+        'font_size_kb': args.font_size_kb, 'zip_junk_kb': args.zip_junk_kb, 'seed': args.seed,
+        'jobs': args.jobs, 'warm': args.warm, 'include': include,
+    }
+
+    cdn_process, base_url = start_cdn(args)
+    warm_workspace = tempfile.mkdtemp(prefix='font-bench-') if args.warm else None
+    try:
+        config = rewrite_config(base_url, args.config, include)
+        print(f"Fake CDN at {base_url}, {len(config['fonts'])} fonts, {args.runs} runs")
+        runs = []
+        for index in range(args.runs):
+            result = run_once(base_url, config, args.jobs, warm_workspace)
+            runs.append(result)
+            print(f"  run {index + 1}: {result['succeeded']}/{result['fonts']} fonts in {result['wall_time']:.2f}s "
+                  f"({result['fonts_per_sec']} fonts/s), {result['requests']} requests, "
+                  f"{result['bytes_transferred'] / (1024 * 1024):.1f} MB, peak {result['peak_memory_mb']} MB")
+    finally:
+        cdn_process.terminate()
+        cdn_process.wait()
+        if warm_workspace:
+            shutil.rmtree(warm_workspace, ignore_errors=True)
+
+    current = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'params': params,
+        'runs': runs,
+        'summary': summarize(runs),
+    }
+
+    print("\nMedian:")
+    for metric, value in current['summary'].items():
+        print(f"  {metric:<20} {value}")
+
+    previous_path = args.compare or latest_result(args.results_dir, params)
+    regressions = []
+    if previous_path:
+        with open(previous_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"\nCompared with {os.path.relpath(previous_path)} ({previous.get('revision')})")
+        regressions = compare(current, previous, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        name = args.name or time.strftime('%Y%m%d-%H%M%S')
+        result_path = os.path.join(args.results_dir, f"{name}.json")
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nSaved {os.path.relpath(result_path)}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
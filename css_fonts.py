@@ -0,0 +1,178 @@
+"""
+@font-face parsing and download planning for Google / Bunny Fonts CSS.
+parse_font_faces turns a stylesheet into structured face records,
+plan_downloads picks the files actually worth fetching: one per
+(family, weight, style), installable formats first, no duplicate URLs.
+"""
+
+import re
+
+FONT_FACE_PATTERN = re.compile(r'@font-face\s*\{(.*?)\}', re.S)
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+
+FORMAT_EXTENSIONS = {
+    'truetype': '.ttf',
+    'opentype': '.otf',
+    'woff': '.woff',
+    'woff2': '.woff2',
+}
+
+# Lower is better: installable as-is, then formats we can convert, then the rest
+FORMAT_RANK = {'.ttf': 0, '.otf': 0, '.woff': 1, '.woff2': 2}
+
+BASIC_LATIN = (0x41, 0x5A)  # A-Z, the subset everyone needs
+
+
+def _split_outside_parens(text, separator):
+    """Split on separator, ignoring separators inside (...) or quotes"""
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '\'"':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif char == separator and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _unquote(value):
+    return value.strip().strip('\'"').strip()
+
+
+def parse_unicode_range(value):
+    """'U+0000-00FF, U+0131, U+04??' -> [(start, end), ...]"""
+    ranges = []
+    for item in value.split(','):
+        item = item.strip().upper()
+        if not item.startswith('U+'):
+            continue
+        item = item[2:]
+        try:
+            if '-' in item:
+                start, end = item.split('-', 1)
+                ranges.append((int(start, 16), int(end, 16)))
+            elif '?' in item:
+                ranges.append((int(item.replace('?', '0'), 16), int(item.replace('?', 'F'), 16)))
+            else:
+                ranges.append((int(item, 16), int(item, 16)))
+        except ValueError:
+            continue
+    return ranges
+
+
+def extension_for(url, font_format=None):
+    """File extension from the CSS format() hint, falling back to the URL"""
+    if font_format and font_format.lower() in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[font_format.lower()]
+    path = url.lower().split('?', 1)[0]
+    for ext in ('.woff2', '.woff', '.ttf', '.otf'):
+        if path.endswith(ext):
+            return ext
+    return None
+
+
+def _parse_src(value):
+    sources = []
+    for item in _split_outside_parens(value, ','):
+        url_match = re.search(r'url\(([^)]*)\)', item)
+        if not url_match:
+            continue  # local(...) and friends
+        url = _unquote(url_match.group(1))
+        if not url or url.startswith('data:'):
+            continue
+        format_match = re.search(r'format\(([^)]*)\)', item)
+        font_format = _unquote(format_match.group(1)) if format_match else None
+        ext = extension_for(url, font_format)
+        if ext:
+            sources.append({'url': url, 'format': font_format, 'ext': ext})
+    return sources
+
+
+def parse_font_faces(css_content):
+    """
+    Parse every @font-face block into
+    {'family', 'weight', 'style', 'unicode_range', 'sources': [{'url', 'format', 'ext'}]}.
+    unicode_range is a list of (start, end) code point pairs, empty when not given.
+    """
+    css_content = COMMENT_PATTERN.sub('', css_content)
+    faces = []
+    for block in FONT_FACE_PATTERN.findall(css_content):
+        declarations = {}
+        for declaration in _split_outside_parens(block, ';'):
+            if ':' not in declaration:
+                continue
+            name, value = declaration.split(':', 1)
+            declarations[name.strip().lower()] = value.strip()
+
+        sources = _parse_src(declarations.get('src', ''))
+        if not sources:
+            continue
+        faces.append({
+            'family': _unquote(declarations.get('font-family', '')),
+            'weight': ' '.join(declarations.get('font-weight', '400').split()),
+            'style': declarations.get('font-style', 'normal').strip().lower(),
+            'unicode_range': parse_unicode_range(declarations.get('unicode-range', '')),
+            'sources': sources,
+        })
+    return faces
+
+
+def _coverage_rank(unicode_range):
+    # No unicode-range means the full font; otherwise prefer the Latin subset, then the widest
+    if not unicode_range:
+        return (0, 0)
+    covers_latin = any(start <= BASIC_LATIN[0] and BASIC_LATIN[1] <= end for start, end in unicode_range)
+    width = sum(end - start + 1 for start, end in unicode_range)
+    return (0 if covers_latin else 1, -width)
+
+
+def plan_downloads(faces):
+    """
+    Choose one file per (family, weight, style). Returns a list of
+    {'url', 'ext', 'family', 'weight', 'style'} in stylesheet order.
+    """
+    best = {}
+    order = []
+    seen_urls = set()
+    for face in faces:
+        key = (face['family'].lower(), face['weight'], face['style'])
+        for source in face['sources']:
+            if source['url'] in seen_urls:
+                continue
+            seen_urls.add(source['url'])
+
+            rank = (FORMAT_RANK.get(source['ext'], 3), _coverage_rank(face['unicode_range']))
+            if key not in best:
+                order.append(key)
+            elif best[key][0] <= rank:
+                continue
+            best[key] = (rank, {
+                'url': source['url'],
+                'ext': source['ext'],
+                'family': face['family'],
+                'weight': face['weight'],
+                'style': face['style'],
+            })
+    return [best[key][1] for key in order]
+
+
+def face_filename(base_name, face, face_count):
+    """Stable file name for a planned face, e.g. Roboto_700_italic.ttf"""
+    if face_count <= 1:
+        return f"{base_name}{face['ext']}"
+    weight = face['weight'].replace(' ', '-')
+    style = '' if face['style'] == 'normal' else f"_{face['style']}"
+    return f"{base_name}_{weight}{style}{face['ext']}"
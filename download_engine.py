@@ -0,0 +1,147 @@
+"""
+Concurrent download engine used by FontDownloader.
+Runs several fonts at once on a bounded thread pool and caps how many
+connections are open to each source host at the same time.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+DEFAULT_CONCURRENCY = 8
+
+# Max simultaneous requests per host (matched on the host or any subdomain of it)
+DEFAULT_HOST_LIMITS = {
+    'fonts.googleapis.com': 4,
+    'fonts.gstatic.com': 8,
+    'fonts.bunny.net': 4,
+    '1001fonts.com': 2,
+    'github.com': 2,
+}
+DEFAULT_HOST_LIMIT = 4
+
+
+def host_of(url):
+    """Return the lowercase host name of a URL"""
+    return (urlparse(url).hostname or '').lower()
+
+
+def match_host(host, table):
+    """(key, value) of the table entry for host or its closest parent domain, or (host, None)"""
+    parts = host.split('.')
+    for i in range(len(parts) - 1):
+        candidate = '.'.join(parts[i:])
+        if candidate in table:
+            return candidate, table[candidate]
+    return host, None
+
+
+class HostLimiter:
+    """Per-host connection caps shared by every worker thread"""
+
+    def __init__(self, host_limits=None, default_limit=DEFAULT_HOST_LIMIT):
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        if host_limits:
+            self.host_limits.update(host_limits)
+        self.default_limit = default_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, host):
+        # Exact match first, then the closest parent domain
+        key, limit = match_host(host, self.host_limits)
+        return key, self.default_limit if limit is None else limit
+
+    def _semaphore(self, url):
+        key, limit = self.limit_for(host_of(url))
+        with self._lock:
+            if key not in self._semaphores:
+                self._semaphores[key] = threading.BoundedSemaphore(max(1, limit))
+            return self._semaphores[key]
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one connection slot for the host of url"""
+        semaphore = self._semaphore(url)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class DownloadEngine:
+    """
+    Runs download_fn(font_key) for many fonts at once.
+
+    Progress is reported by calling on_event(event) with a dict:
+        {'type': 'font_started', 'font_key': ...}
+        {'type': 'font_finished', 'font_key': ..., 'success': bool, 'completed': n, 'total': n}
+        {'type': 'run_finished', 'succeeded': [...], 'failed': [...]}
+    Calls to on_event are serialized, so the handler does not need its own lock.
+
+    download_fn may also return a Future when the font was handed to later
+    pipeline stages; the font finishes when that Future resolves (to a bool,
+    or to another Future, e.g. one from continue_font()).
+    """
+
+    def __init__(self, download_fn, concurrency=DEFAULT_CONCURRENCY, on_event=None):
+        self.download_fn = download_fn
+        self.concurrency = max(1, int(concurrency))
+        self.on_event = on_event
+        self._event_lock = threading.Lock()
+        self._executor = None
+
+    def emit(self, event):
+        if self.on_event is None:
+            return
+        with self._event_lock:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Progress handler error: {e}")
+
+    def _run_one(self, font_key, *args):
+        if not args:
+            self.emit({'type': 'font_started', 'font_key': font_key})
+        try:
+            result = self.download_fn(font_key, *args)
+            return result if isinstance(result, Future) else bool(result)
+        except Exception as e:
+            print(f"Unexpected error downloading {font_key}: {e}")
+            return False
+
+    def continue_font(self, font_key, *args):
+        """Run download_fn(font_key, *args) again on the pool (e.g. the next source). Only valid during run()."""
+        return self._executor.submit(self._run_one, font_key, *args)
+
+    def run(self, font_keys):
+        """Download every font key and return (succeeded, failed) lists of keys"""
+        font_keys = list(font_keys)
+        succeeded = []
+        failed = []
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix='font-download') as executor:
+            self._executor = executor
+            pending = {executor.submit(self._run_one, key): key for key in font_keys}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    font_key = pending.pop(future)
+                    result = future.result()
+                    if isinstance(result, Future):
+                        # Handed on to a later stage, it finishes there
+                        pending[result] = font_key
+                        continue
+                    success = bool(result)
+                    completed += 1
+                    (succeeded if success else failed).append(font_key)
+                    self.emit({'type': 'font_finished', 'font_key': font_key, 'success': success,
+                               'completed': completed, 'total': len(font_keys)})
+            self._executor = None
+
+        self.emit({'type': 'run_finished', 'succeeded': succeeded, 'failed': failed})
+        return succeeded, failed
@@ -0,0 +1,282 @@
+"""
+Font metadata index.
+Reads the real family and style of .ttf/.otf files straight from their
+memory-mapped table directory, `name` and `OS/2` tables (nothing else is
+parsed), on a thread pool, and keeps the results with each file's size,
+mtime and SHA-256 in font_index.json. Later runs only re-read files that
+changed, so "is this font already installed, maybe under another file
+name?" is a dictionary lookup by hash or by family and style.
+"""
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_FILENAME = 'font_index.json'
+INDEX_VERSION = 1
+DEFAULT_INDEX_WORKERS = 8
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+SFNT_TAGS = (b'\x00\x01\x00\x00', b'OTTO', b'true')
+TABLE_RECORD = struct.Struct('>4sIII')  # tag, checksum, offset, length
+NAME_RECORD = struct.Struct('>6H')  # platform, encoding, language, name id, length, offset
+
+# name IDs: family, subfamily, full name, typographic family/subfamily
+NAME_FAMILY, NAME_SUBFAMILY, NAME_FULL, NAME_TYPO_FAMILY, NAME_TYPO_SUBFAMILY = 1, 2, 4, 16, 17
+WANTED_NAMES = (NAME_FAMILY, NAME_SUBFAMILY, NAME_FULL, NAME_TYPO_FAMILY, NAME_TYPO_SUBFAMILY)
+
+
+class FontFormatError(ValueError):
+    """Not an sfnt font, or its tables point outside the file"""
+
+
+def _name_rank(platform, encoding, language):
+    """Lower is better: Windows US English, any Windows, Unicode, Mac Roman English"""
+    if platform == 3 and encoding in (1, 10):
+        return 0 if language == 0x409 else 1
+    if platform == 0:
+        return 2
+    if platform == 1 and encoding == 0:
+        return 3 if language == 0 else 4
+    return None
+
+
+def _read_names(data, offset, length):
+    _, count, string_offset = struct.unpack_from('>HHH', data, offset)
+    strings = offset + string_offset
+    best = {}
+    for i in range(count):
+        platform, encoding, language, name_id, size, start = NAME_RECORD.unpack_from(data, offset + 6 + 12 * i)
+        if name_id not in WANTED_NAMES:
+            continue
+        rank = _name_rank(platform, encoding, language)
+        if rank is None or (name_id in best and best[name_id][0] <= rank):
+            continue
+        if strings + start + size > offset + length or strings + start + size > len(data):
+            raise FontFormatError("name record outside the name table")
+        raw = bytes(data[strings + start:strings + start + size])
+        text = raw.decode('mac_roman' if platform == 1 else 'utf-16-be', errors='replace').strip('\0 ')
+        if text:
+            best[name_id] = (rank, text)
+    return {name_id: text for name_id, (_, text) in best.items()}
+
+
+def parse_font_info(data):
+    """{'family', 'style', 'full_name', 'weight', 'italic'} from sfnt bytes (anything sliceable, e.g. an mmap)"""
+    try:
+        offset = 0
+        if data[:4] == b'ttcf':
+            # Collection: describe the first font in it
+            offset = struct.unpack_from('>I', data, 12)[0]
+        if data[offset:offset + 4] not in SFNT_TAGS:
+            raise FontFormatError("not a TrueType/OpenType font")
+        num_tables = struct.unpack_from('>H', data, offset + 4)[0]
+        tables = {}
+        for i in range(num_tables):
+            tag, _, table_offset, table_length = TABLE_RECORD.unpack_from(data, offset + 12 + 16 * i)
+            if table_offset + table_length > len(data):
+                raise FontFormatError(f"{tag!r} table outside the file")
+            tables[tag] = (table_offset, table_length)
+
+        names = _read_names(data, *tables[b'name']) if b'name' in tables else {}
+        weight = 400
+        italic = False
+        if b'OS/2' in tables:
+            os2_offset, os2_length = tables[b'OS/2']
+            if os2_length >= 6:
+                weight = struct.unpack_from('>H', data, os2_offset + 4)[0]
+            if os2_length >= 64:
+                italic = bool(struct.unpack_from('>H', data, os2_offset + 62)[0] & 0x01)
+    except struct.error as e:
+        raise FontFormatError(str(e))
+
+    family = names.get(NAME_TYPO_FAMILY) or names.get(NAME_FAMILY)
+    style = names.get(NAME_TYPO_SUBFAMILY) or names.get(NAME_SUBFAMILY) or 'Regular'
+    return {
+        'family': family,
+        'style': style,
+        'full_name': names.get(NAME_FULL) or (f"{family} {style}" if family else None),
+        'weight': weight,
+        'italic': italic,
+    }
+
+
+def read_font_info(path, with_hash=True):
+    """
+    parse_font_info for a file, through a read-only mmap so only the pages
+    holding the tables are touched (plus the whole file when hashing).
+    Unreadable fonts get family None, they can still be matched by hash.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        info = {'family': None, 'style': None, 'full_name': None, 'weight': None, 'italic': False}
+        if stat.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                try:
+                    info = parse_font_info(data)
+                except FontFormatError:
+                    pass
+                if with_hash:
+                    info['sha256'] = hashlib.sha256(data).hexdigest()
+        elif with_hash:
+            info['sha256'] = hashlib.sha256().hexdigest()
+    info['size'] = stat.st_size
+    info['mtime_ns'] = stat.st_mtime_ns
+    return info
+
+
+def font_full_name(path):
+    """The font's full name (e.g. 'Builder Sans Bold'), or None if it can't be read"""
+    try:
+        return read_font_info(path, with_hash=False)['full_name']
+    except (OSError, ValueError):
+        return None
+
+
+def _folder_key(path):
+    return os.path.normcase(os.path.dirname(os.path.abspath(path)))
+
+
+def face_key(info):
+    """What makes two files the same face: family, style, weight class and italic"""
+    if not info.get('family'):
+        return None
+    return (info['family'].lower(), (info['style'] or '').lower(), info['weight'], info['italic'])
+
+
+class FontIndex:
+    """Persisted {path: font info}, with O(1) lookups per folder by hash and by face"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fonts = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._by_hash = {}
+        self._by_face = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == INDEX_VERSION:
+            self.fonts = data.get('fonts', {})
+            for font_path, info in self.fonts.items():
+                self._add_lookups(font_path, info)
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({'version': INDEX_VERSION, 'fonts': self.fonts})
+            self.dirty = False
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Couldn't save font index {self.path}: {e}")
+
+    def _add_lookups(self, font_path, info):
+        # Caller holds self._lock (or is __init__)
+        folder = _folder_key(font_path)
+        self._by_hash[(folder, info['sha256'])] = font_path
+        key = face_key(info)
+        if key:
+            self._by_face[(folder,) + key] = font_path
+
+    def _drop_lookups(self, font_path, info):
+        folder = _folder_key(font_path)
+        if self._by_hash.get((folder, info['sha256'])) == font_path:
+            del self._by_hash[(folder, info['sha256'])]
+        key = face_key(info)
+        if key and self._by_face.get((folder,) + key) == font_path:
+            del self._by_face[(folder,) + key]
+
+    def _store(self, font_path, info):
+        with self._lock:
+            old = self.fonts.get(font_path)
+            if old:
+                self._drop_lookups(font_path, old)
+            self.fonts[font_path] = info
+            self._add_lookups(font_path, info)
+            self.dirty = True
+
+    def _is_current(self, font_path):
+        info = self.fonts.get(font_path)
+        if not info:
+            return False
+        try:
+            stat = os.stat(font_path)
+        except OSError:
+            return False
+        return stat.st_size == info['size'] and stat.st_mtime_ns == info['mtime_ns']
+
+    def add(self, font_path):
+        """Info for one file, read only if it's new or changed since it was indexed"""
+        font_path = os.path.abspath(font_path)
+        if not self._is_current(font_path):
+            self._store(font_path, read_font_info(font_path))
+        return self.fonts[font_path]
+
+    def index_folder(self, folder, workers=DEFAULT_INDEX_WORKERS):
+        """Bring every font file in folder up to date on a thread pool. Returns how many were (re)read."""
+        folder = os.path.abspath(folder)
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return 0
+        paths = [os.path.join(folder, name) for name in names if name.lower().endswith(FONT_EXTENSIONS)]
+
+        # Forget files that were deleted since the last run
+        folder_key = os.path.normcase(folder)
+        present = set(paths)
+        with self._lock:
+            for font_path in [p for p in self.fonts if _folder_key(p) == folder_key and p not in present]:
+                self._drop_lookups(font_path, self.fonts.pop(font_path))
+                self.dirty = True
+
+        stale = [font_path for font_path in paths if not self._is_current(font_path)]
+
+        def read_one(font_path):
+            try:
+                return font_path, read_font_info(font_path)
+            except (OSError, ValueError):
+                return font_path, None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for font_path, info in executor.map(read_one, stale):
+                if info is not None:
+                    self._store(font_path, info)
+        return len(stale)
+
+    def in_folder(self, folder):
+        """{path: info} of the indexed fonts in folder"""
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        with self._lock:
+            return {p: info for p, info in self.fonts.items() if _folder_key(p) == folder_key}
+
+    def by_hash(self, sha256, folder):
+        """Path of a file in folder with exactly these bytes, or None"""
+        with self._lock:
+            return self._by_hash.get((os.path.normcase(os.path.abspath(folder)), sha256))
+
+    def by_face(self, info, folder):
+        """Path of a file in folder with the same family and style as info, or None"""
+        key = face_key(info)
+        if not key:
+            return None
+        with self._lock:
+            return self._by_face.get((os.path.normcase(os.path.abspath(folder)),) + key)
+
+    def installed_copy(self, info, fonts_dir):
+        """Path of an installed font with the same bytes or the same face as info, or None"""
+        return self.by_hash(info['sha256'], fonts_dir) or self.by_face(info, fonts_dir)
@@ -0,0 +1,220 @@
+"""
+Font installation backends with batch semantics.
+Fonts are staged one by one as they arrive (copied into the fonts folder and
+loaded), then commit() finishes the batch in one go: a single registry key
+session and one WM_FONTCHANGE broadcast on Windows, one cache rebuild with
+fontconfig on Linux.
+"""
+
+import os
+import sys
+import shutil
+import threading
+import subprocess
+
+from font_index import font_full_name, parse_font_info, FontFormatError
+
+FONTS_REG_PATH = r'SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts'
+HWND_BROADCAST = 0xFFFF
+WM_FONTCHANGE = 0x001D
+
+
+def registry_name_for(font_filename, full_name=None):
+    """
+    Registry value name Windows expects, e.g. 'Roboto Bold (TrueType)'.
+    Uses the font's full name from its name table, the file name if it has none.
+    """
+    font_name_no_ext, font_extension = os.path.splitext(font_filename)
+    if font_extension.lower() == '.otf':
+        font_type = '(OpenType)'
+    else:
+        font_type = '(TrueType)'  # Default fallback
+    return f"{full_name or font_name_no_ext} {font_type}"
+
+
+class InstallBackend:
+    """Stage fonts as they arrive, then commit() the whole batch"""
+
+    name = 'base'
+
+    def __init__(self, fonts_dir=None):
+        self.fonts_dir = fonts_dir
+        self._lock = threading.Lock()
+        self.staged = []
+
+    def stage(self, font_path):
+        """Install one font file into the batch. Returns True on success."""
+        raise NotImplementedError
+
+    def commit(self):
+        """Finish the batch (registry, notifications, caches). Returns the number of fonts committed."""
+        raise NotImplementedError
+
+    def stage_bytes(self, font_filename, data):
+        """Install a font from memory (e.g. a slice of a mapped font pack) without a temp copy"""
+        dest_path = os.path.join(self.fonts_dir, font_filename)
+        if not os.path.exists(dest_path) or os.path.getsize(dest_path) != len(data):
+            temp_path = dest_path + '.part'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, dest_path)
+        return self.stage(dest_path)
+
+    def _take_staged(self):
+        with self._lock:
+            staged, self.staged = self.staged, []
+        return staged
+
+
+class WindowsInstallBackend(InstallBackend):
+    name = 'windows'
+
+    def __init__(self, fonts_dir=None):
+        super().__init__(fonts_dir or os.path.join(os.environ['WINDIR'], 'Fonts'))
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+
+        # Setup Windows API calls with proper types, once
+        self.gdi32 = ctypes.windll.gdi32
+        self.user32 = ctypes.windll.user32
+        self.gdi32.AddFontResourceW.argtypes = [wintypes.LPCWSTR]
+        self.gdi32.AddFontResourceW.restype = ctypes.c_int
+        self.user32.SendMessageTimeoutW.argtypes = [
+            wintypes.HWND, wintypes.UINT, wintypes.WPARAM,
+            wintypes.LPARAM, wintypes.UINT, wintypes.UINT,
+            ctypes.POINTER(wintypes.DWORD)
+        ]
+
+    def stage(self, font_path):
+        font_filename = os.path.basename(font_path)
+        dest_path = os.path.join(self.fonts_dir, font_filename)
+
+        # Only copy if it doesn't exist
+        if not os.path.exists(dest_path):
+            shutil.copy2(font_path, dest_path)
+
+        # Load the font resource for this session, registry entry comes at commit
+        if self.gdi32.AddFontResourceW(dest_path) <= 0:
+            return False
+
+        with self._lock:
+            self.staged.append((registry_name_for(font_filename, font_full_name(dest_path)), font_filename))
+        return True
+
+    def commit(self):
+        import winreg
+        staged = self._take_staged()
+        if not staged:
+            return 0
+
+        # Add to Windows registry for permanent installation, one key session for the batch
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, FONTS_REG_PATH, 0, winreg.KEY_SET_VALUE) as key:
+                for registry_name, font_filename in staged:
+                    winreg.SetValueEx(key, registry_name, 0, winreg.REG_SZ, font_filename)
+        except OSError as e:
+            print(f"Registry error: {e}")
+
+        # Notify system once, with timeout to prevent hanging
+        try:
+            timeout_result = self.wintypes.DWORD()
+            self.user32.SendMessageTimeoutW(
+                HWND_BROADCAST, WM_FONTCHANGE, 0, 0,
+                0, 1000, self.ctypes.byref(timeout_result)  # 1 second timeout
+            )
+        except Exception:
+            # Fallback to simple SendMessage
+            self.user32.SendMessageW(HWND_BROADCAST, WM_FONTCHANGE, 0, 0)
+
+        return len(staged)
+
+
+class FontconfigInstallBackend(InstallBackend):
+    """Per-user install on Linux: ~/.local/share/fonts plus one fc-cache run"""
+
+    name = 'fontconfig'
+
+    def __init__(self, fonts_dir=None):
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+        super().__init__(fonts_dir or os.path.join(data_home, 'fonts'))
+        os.makedirs(self.fonts_dir, exist_ok=True)
+
+    def stage(self, font_path):
+        dest_path = os.path.join(self.fonts_dir, os.path.basename(font_path))
+        if not os.path.exists(dest_path) or os.path.getsize(dest_path) != os.path.getsize(font_path):
+            shutil.copy2(font_path, dest_path)
+        with self._lock:
+            self.staged.append(dest_path)
+        return True
+
+    def commit(self):
+        staged = self._take_staged()
+        if not staged:
+            return 0
+        fc_cache = shutil.which('fc-cache')
+        if fc_cache:
+            try:
+                subprocess.run([fc_cache, '-f', self.fonts_dir], check=False, timeout=120,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"fc-cache failed: {e}")
+        return len(staged)
+
+
+class FakeInstallBackend(InstallBackend):
+    """In-memory backend for measuring install throughput off Windows"""
+
+    name = 'fake'
+
+    def __init__(self, fonts_dir=None):
+        super().__init__(fonts_dir)
+        self.installed = {}
+        self.commits = 0
+        self.broadcasts = 0
+
+    def stage(self, font_path):
+        size = os.path.getsize(font_path)
+        registry_name = registry_name_for(os.path.basename(font_path), font_full_name(font_path))
+        with self._lock:
+            self.staged.append((registry_name, size))
+        return True
+
+    def stage_bytes(self, font_filename, data):
+        try:
+            full_name = parse_font_info(data)['full_name']
+        except FontFormatError:
+            full_name = None
+        with self._lock:
+            self.staged.append((registry_name_for(font_filename, full_name), len(data)))
+        return True
+
+    def commit(self):
+        staged = self._take_staged()
+        with self._lock:
+            for registry_name, size in staged:
+                self.installed[registry_name] = size
+            self.commits += 1
+            if staged:
+                self.broadcasts += 1
+        return len(staged)
+
+
+BACKENDS = {
+    'windows': WindowsInstallBackend,
+    'fontconfig': FontconfigInstallBackend,
+    'fake': FakeInstallBackend,
+}
+
+
+def get_backend(name='auto', fonts_dir=None):
+    """Pick an install backend by name, 'auto' chooses by platform (None if unsupported)"""
+    if not name or name == 'auto':
+        if sys.platform == 'win32':
+            name = 'windows'
+        elif sys.platform.startswith('linux'):
+            name = 'fontconfig'
+        else:
+            return None
+    return BACKENDS[name](fonts_dir)
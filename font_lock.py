@@ -0,0 +1,99 @@
+"""
+Lockfile of resolved font sources.
+`--resolve` records, per font key, the concrete URL of every file a run
+actually fetched, with its size and SHA-256. Later runs download those
+pinned files directly: no CSS round-trips, every file hash-checked. A
+pinned URL that has disappeared (404/410) sends just that font through
+normal resolution again, and the lockfile is updated.
+
+Entry kinds:
+    'files'   - files fetched directly (CSS faces, direct .ttf links): [{'url', 'name', 'ext', 'size', 'sha256'}]
+    'archive' - fonts extracted from source_url: [{'name', 'size', 'sha256'}]
+"""
+
+import os
+import json
+import time
+import threading
+
+LOCK_FILENAME = 'fonts.lock.json'
+LOCK_VERSION = 1
+
+GONE_STATUSES = (404, 410)
+
+
+def is_gone(error):
+    """True if error is an HTTP 404/410, i.e. the pinned URL no longer exists"""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) in GONE_STATUSES
+
+
+class FontLock:
+    """
+    Pins are read from path, or from fallback_path (a read-only copy, e.g. the
+    one bundled in the executable) when path doesn't exist yet. Writes always go to path.
+    """
+
+    def __init__(self, path, resolve=False, fallback_path=None):
+        self.path = path
+        self.resolve = resolve  # Ignore existing pins and write a fresh lockfile
+        self._lock = threading.Lock()
+        self.fonts = {}
+        self.exists = False
+        self.dirty = False
+        if not resolve:
+            if not self._load(path) and fallback_path:
+                self._load(fallback_path)
+
+    def _load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != LOCK_VERSION:
+            return False
+        self.fonts = data.get('fonts', {})
+        self.exists = True
+        return True
+
+    def get(self, font_key, config_urls):
+        """Pinned entry for font_key, or None if not locked or config.json changed its URLs"""
+        if self.resolve:
+            return None
+        with self._lock:
+            entry = self.fonts.get(font_key)
+        if not entry or entry['urls'] != list(config_urls) or not entry['files']:
+            return None
+        return entry
+
+    def pin(self, font_key, config_urls, source_url, kind, files):
+        entry = {
+            'urls': list(config_urls),
+            'source_url': source_url,
+            'kind': kind,
+            'files': [dict(entry) for entry in files],
+        }
+        with self._lock:
+            if self.fonts.get(font_key) != entry:
+                self.fonts[font_key] = entry
+                self.dirty = True
+
+    def save(self):
+        """Write the lockfile if this run resolved anything new (only when locking is in use)"""
+        if not self.dirty or not (self.exists or self.resolve):
+            return False
+        with self._lock:
+            data = json.dumps({'version': LOCK_VERSION,
+                               'resolved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                               'fonts': dict(sorted(self.fonts.items()))}, indent=1)
+            self.dirty = False
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Couldn't write lockfile {self.path}: {e}")
+            return False
+        return True
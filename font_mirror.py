@@ -0,0 +1,230 @@
+"""
+LAN font mirror.
+One machine that already downloaded the fonts serves them to the rest of a
+lab, so every machine doesn't pull the same ZIPs and CSS files from Google,
+Bunny, 1001fonts and GitHub. Routes:
+
+    /fonts/<font key>.json   the files that font resolved to: {'kind': 'files', 'source_url', 'files': [{'url', 'name', 'ext', 'size', 'sha256'}]}
+    /files/<file name>       a font file from downloaded_fonts (Range, If-Range, ETag, sendfile)
+    /index.json              every font key the mirror can serve
+
+Clients point "mirror_url" (or --mirror) at http://host:port and fall back
+to the upstream URLs in config.json for anything the mirror doesn't have.
+"""
+
+import os
+import json
+import threading
+from email.utils import formatdate
+from urllib.parse import quote, unquote, urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from state_manifest import MANIFEST_FILENAME
+
+DEFAULT_MIRROR_PORT = 8765
+DEFAULT_MIRROR_ADDRESS = f'0.0.0.0:{DEFAULT_MIRROR_PORT}'
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+
+def mirror_font_url(base_url, font_key):
+    """Where a mirror at base_url lists the files of font_key"""
+    return f"{base_url.rstrip('/')}/fonts/{quote(font_key, safe='')}.json"
+
+
+def parse_range(value, size):
+    """(start, end) inclusive for a single 'bytes=' range, None for no/unsupported range, False if unsatisfiable"""
+    if not value or not value.startswith('bytes=') or ',' in value:
+        return None
+    start, _, end = value[len('bytes='):].strip().partition('-')
+    try:
+        if not start:
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class MirrorIndex:
+    """What downloaded_fonts holds, re-read whenever font_state.json changes"""
+
+    def __init__(self, downloads_dir):
+        self.downloads_dir = downloads_dir
+        self.manifest_path = os.path.join(downloads_dir, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._fonts = {}
+        self._hashes = {}
+
+    def _refresh(self):
+        # Caller holds self._lock
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        self._fonts = {}
+        self._hashes = {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                fonts = json.load(f).get('fonts', {})
+        except (OSError, ValueError):
+            return
+        for font_key, entry in fonts.items():
+            files = [(name, info) for name, info in sorted(entry.get('files', {}).items())
+                     if name.lower().endswith(FONT_EXTENSIONS)]
+            if files:
+                self._fonts[font_key] = {'source_url': entry.get('source_url'), 'files': files}
+            for name, info in files:
+                self._hashes[name] = info['sha256']
+
+    def font_keys(self):
+        with self._lock:
+            self._refresh()
+            return sorted(self._fonts)
+
+    def font_entry(self, font_key, base_url):
+        """Lockfile-style entry for font_key with absolute file URLs, or None"""
+        with self._lock:
+            self._refresh()
+            font = self._fonts.get(font_key)
+        if font is None:
+            return None
+        files = []
+        for name, info in font['files']:
+            path = os.path.join(self.downloads_dir, name)
+            try:
+                if os.path.getsize(path) != info['size']:
+                    return None  # Changed since it was recorded, let the client go upstream
+            except OSError:
+                return None
+            files.append({'url': f"{base_url}/files/{quote(name)}", 'name': name,
+                          'ext': os.path.splitext(name)[1].lower(), 'size': info['size'], 'sha256': info['sha256']})
+        return {'kind': 'files', 'source_url': font['source_url'], 'files': files}
+
+    def file_path(self, name):
+        """Path of a servable font file, or None (no sub-folders, only font files)"""
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            return None
+        if not name.lower().endswith(FONT_EXTENSIONS):
+            return None
+        path = os.path.join(self.downloads_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def etag(self, name, stat):
+        with self._lock:
+            digest = self._hashes.get(name)
+        return f'"{digest[:32]}"' if digest else f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    server_version = 'RobloxFontsMirror/1'
+    protocol_version = 'HTTP/1.1'  # Keep-alive, clients reuse one connection per host
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self.handle_get(send_body=False)
+
+    def do_GET(self):
+        self.handle_get(send_body=True)
+
+    def base_url(self):
+        host = self.headers.get('Host') or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}"
+
+    def handle_get(self, send_body):
+        path = unquote(urlparse(self.path).path)
+        if path == '/index.json':
+            return self.send_json({'fonts': self.server.index.font_keys()}, send_body)
+        if path.startswith('/fonts/') and path.endswith('.json'):
+            entry = self.server.index.font_entry(path[len('/fonts/'):-len('.json')], self.base_url())
+            if entry is None:
+                return self.send_error(404, "Font not on this mirror")
+            return self.send_json(entry, send_body)
+        if path.startswith('/files/'):
+            return self.send_font_file(path[len('/files/'):], send_body)
+        self.send_error(404)
+
+    def send_json(self, data, send_body):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_font_file(self, name, send_body):
+        index = self.server.index
+        path = index.file_path(name)
+        if path is None:
+            return self.send_error(404)
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = index.etag(name, stat)
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            byte_range = parse_range(self.headers.get('Range'), size)
+            if_range = self.headers.get('If-Range')
+            if byte_range and if_range and if_range not in (etag, last_modified):
+                byte_range = None  # File changed since the client's partial copy, send it whole
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1 if size else 0
+            self.send_response(206 if byte_range else 200)
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Type', 'font/otf' if name.lower().endswith('.otf') else 'font/ttf')
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            if send_body and length:
+                # Zero-copy from the page cache where the OS supports it (sendfile), plain send otherwise
+                self.connection.sendfile(f, start, length)
+                self.server.count_sent(length)
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """One thread per client connection"""
+
+    daemon_threads = True
+
+    def __init__(self, downloads_dir, host='0.0.0.0', port=DEFAULT_MIRROR_PORT, verbose=False):
+        self.index = MirrorIndex(downloads_dir)
+        self.verbose = verbose
+        self.bytes_sent = 0
+        self._stats_lock = threading.Lock()
+        super().__init__((host, port), MirrorHandler)
+
+    def count_sent(self, size):
+        with self._stats_lock:
+            self.bytes_sent += size
@@ -0,0 +1,203 @@
+"""
+Offline font packs.
+One file with every downloaded font, for machines with poor or no internet:
+
+    header  magic, version, number of fonts, where the data starts
+    index   one fixed-size record per file: font key, file name, offset, length, SHA-256
+    data    the font files back to back
+
+Records have a fixed layout, so the importer memory-maps the pack, reads any
+record by position and installs straight from slices of the mapping, with no
+unpacking to a temp folder.
+"""
+
+import os
+import mmap
+import struct
+import fnmatch
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+PACK_MAGIC = b'RFPK'
+PACK_VERSION = 1
+PACK_EXTENSION = '.rfpack'
+
+HEADER = struct.Struct('<4sHHIQ')  # magic, version, reserved, count, data offset
+RECORD = struct.Struct('<64s128sQQ32s')  # font key, file name, offset, length, sha256
+DATA_ALIGN = 8
+COPY_CHUNK = 1024 * 1024
+DEFAULT_PACK_WORKERS = 8
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+
+class PackError(ValueError):
+    """The file is not a font pack or is damaged"""
+
+
+def _encode(text, size, what):
+    data = text.encode('utf-8')
+    if len(data) > size:
+        raise PackError(f"{what} too long for a font pack: {text}")
+    return data
+
+
+def _decode(data):
+    return data.rstrip(b'\0').decode('utf-8')
+
+
+def split_patterns(values):
+    """Repeated/comma separated --include/--exclude values -> a flat list of patterns"""
+    return [pattern.strip() for value in values for pattern in value.split(',') if pattern.strip()]
+
+
+def collect_pack_files(downloads_dir, manifest_fonts=None):
+    """
+    [(font_key, path)] for every font in downloads_dir. Font keys come from the
+    state manifest; fonts it doesn't know about get an empty key.
+    """
+    files = []
+    seen = set()
+    for font_key, entry in sorted((manifest_fonts or {}).items()):
+        for filename in sorted(entry.get('files', {})):
+            path = os.path.join(downloads_dir, filename)
+            if filename.lower().endswith(FONT_EXTENSIONS) and os.path.isfile(path) and filename not in seen:
+                seen.add(filename)
+                files.append((font_key, path))
+    for filename in sorted(os.listdir(downloads_dir)):
+        if filename.lower().endswith(FONT_EXTENSIONS) and filename not in seen:
+            files.append(('', os.path.join(downloads_dir, filename)))
+    return files
+
+
+def export_pack(files, pack_path):
+    """Write files ([(font_key, path)]) to pack_path. Returns (fonts, data bytes)."""
+    entries = []
+    offset = HEADER.size + RECORD.size * len(files)
+    offset += -offset % DATA_ALIGN
+    data_offset = offset
+    for font_key, path in files:
+        length = os.path.getsize(path)
+        entries.append([_encode(font_key, 64, 'Font key'), _encode(os.path.basename(path), 128, 'File name'),
+                        offset, length, path])
+        offset += length + (-length % DATA_ALIGN)
+
+    temp_path = pack_path + '.tmp'
+    with open(temp_path, 'wb') as out:
+        out.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(entries), data_offset))
+        # Index first with empty hashes, the real ones are known once the data is copied
+        out.write(b'\0' * (data_offset - HEADER.size))
+        for entry in entries:
+            key, name, offset, length, path = entry
+            out.seek(offset)
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+                    sha256.update(chunk)
+                    out.write(chunk)
+            entry[4] = sha256.digest()
+        out.write(b'\0' * (-out.tell() % DATA_ALIGN))
+        out.seek(HEADER.size)
+        for key, name, offset, length, digest in entries:
+            out.write(RECORD.pack(key, name, offset, length, digest))
+    os.replace(temp_path, pack_path)
+    return len(entries), sum(entry[3] for entry in entries)
+
+
+class FontPack:
+    """Read-only, memory-mapped font pack. Use as a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise PackError(f"{path} is empty")
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < HEADER.size:
+            raise PackError(f"{self.path} is not a font pack")
+        magic, version, _, self.count, self.data_offset = HEADER.unpack_from(self._map, 0)
+        if magic != PACK_MAGIC:
+            raise PackError(f"{self.path} is not a font pack")
+        if version != PACK_VERSION:
+            raise PackError(f"{self.path} is pack version {version}, this build reads {PACK_VERSION}")
+        if HEADER.size + self.count * RECORD.size > self.data_offset or self.data_offset > len(self._map):
+            raise PackError(f"{self.path} has a damaged index")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def entry(self, index):
+        """{'font_key', 'name', 'offset', 'length', 'sha256'} of record number index"""
+        key, name, offset, length, digest = RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+        if offset < self.data_offset or offset + length > len(self._map):
+            raise PackError(f"{self.path}: record {index} points outside the pack")
+        return {'font_key': _decode(key), 'name': _decode(name), 'offset': offset,
+                'length': length, 'sha256': digest.hex()}
+
+    def entries(self):
+        return [self.entry(index) for index in range(self.count)]
+
+    def select(self, include=None, exclude=None):
+        """Entries whose font key or file name matches any include pattern and no exclude pattern"""
+        def matches(entry, patterns):
+            return any(fnmatch.fnmatch(entry['font_key'].lower(), pattern.lower()) or
+                       fnmatch.fnmatch(entry['name'].lower(), pattern.lower()) for pattern in patterns)
+
+        entries = self.entries()
+        if include:
+            entries = [entry for entry in entries if matches(entry, include)]
+        if exclude:
+            entries = [entry for entry in entries if not matches(entry, exclude)]
+        return entries
+
+    def data(self, entry):
+        """Zero-copy view of a file's bytes, release it before closing the pack"""
+        return memoryview(self._map)[entry['offset']:entry['offset'] + entry['length']]
+
+
+def install_pack(pack, entries, backend, workers=DEFAULT_PACK_WORKERS):
+    """
+    Hash-check and stage every entry straight from the mapped pack on a thread
+    pool, then commit once. Returns (installed, failed) lists of file names.
+    """
+    def install_one(entry):
+        with pack.data(entry) as view:
+            if hashlib.sha256(view).hexdigest() != entry['sha256']:
+                return entry, "hash mismatch, the pack is damaged"
+            try:
+                return entry, None if backend.stage_bytes(entry['name'], view) else "could not be registered"
+            except Exception as e:
+                return entry, str(e)
+
+    installed = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for entry, error in executor.map(install_one, entries):
+            if error:
+                print(f"  Error installing {entry['name']}: {error}")
+                failed.append(entry['name'])
+            else:
+                installed.append(entry['name'])
+    backend.commit()
+    return installed, failed
@@ -0,0 +1,182 @@
+"""
+Frame-paced GUI progress.
+Download threads only put events on a queue. A single Tk timer drains it at
+a fixed frame rate, folds everything that arrived since the last frame into
+one ProgressModel and redraws just what changed, so parallel downloads and
+per-chunk byte counts never flood the Tk event loop.
+"""
+
+import time
+import queue
+
+FRAME_INTERVAL_MS = 50  # 20 redraws per second at most
+
+STATE_ICONS = {
+    'queued': '·',
+    'downloading': '↓',
+    'done': '✓',
+    'failed': '✗',
+}
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def format_bytes(size):
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    if size >= 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size} B"
+
+
+class ProgressModel:
+    """
+    Run progress folded from events. Only the Tk thread touches it.
+    Fonts are weighted by their expected cost in seconds (from the 'schedule'
+    event), so one big archive counts for more than a single small file.
+    """
+
+    MIN_ETA_PROGRESS = 0.03  # Too early to extrapolate below this
+
+    def __init__(self, fonts):
+        # fonts: [(font_key, display_name), ...] in list order
+        self.order = [font_key for font_key, _ in fonts]
+        self.fonts = {font_key: {'name': name, 'state': 'queued', 'bytes': 0, 'expected': 0,
+                                 'cost': 1.0, 'started': None}
+                      for font_key, name in fonts}
+        self.completed = 0
+        self.failed = 0
+        self.total_bytes = 0
+        self.total_cost = float(len(fonts)) or 1.0
+        self.done_cost = 0.0
+        self.started_at = None
+        self.changed = set()
+        self.latest_started = None
+
+    def apply(self, event):
+        font = self.fonts.get(event.get('font_key'))
+        if event['type'] == 'schedule':
+            for font_key, cost in event['costs'].items():
+                if font_key in self.fonts:
+                    self.fonts[font_key]['cost'] = max(0.01, cost)
+            self.total_cost = sum(font['cost'] for font in self.fonts.values()) or 1.0
+            self.done_cost = sum(font['cost'] for font in self.fonts.values() if font['state'] in ('done', 'failed'))
+            return
+        if event['type'] == 'font_started' and font:
+            font['state'] = 'downloading'
+            font['started'] = time.monotonic()
+            if self.started_at is None:
+                self.started_at = font['started']
+            self.latest_started = event['font_key']
+        elif event['type'] == 'bytes' and font:
+            font['bytes'] += event['bytes']
+            font['expected'] += event.get('expected') or 0
+            self.total_bytes += event['bytes']
+        elif event['type'] == 'font_finished' and font:
+            font['state'] = 'done' if event['success'] else 'failed'
+            self.completed = event['completed']
+            self.done_cost += font['cost']
+            if not event['success']:
+                self.failed += 1
+        else:
+            return
+        self.changed.add(event['font_key'])
+
+    def take_changes(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def progress(self, now=None):
+        """
+        Fraction of the run's expected cost done: finished fonts plus how far the
+        fonts in flight are, by bytes when their sizes are known, by time otherwise
+        """
+        now = time.monotonic() if now is None else now
+        partial = 0.0
+        for font in self.fonts.values():
+            if font['state'] != 'downloading':
+                continue
+            if font['expected']:
+                fraction = font['bytes'] / font['expected']
+            else:
+                fraction = (now - font['started']) / font['cost']
+            # A font may still have files to start or install, never show it as complete early
+            partial += min(0.95, fraction) * font['cost']
+        return min(1.0, (self.done_cost + partial) / self.total_cost)
+
+    def eta(self, now=None):
+        """Seconds left, extrapolated from the cost-weighted progress so far, or None if too early"""
+        now = time.monotonic() if now is None else now
+        if self.started_at is None:
+            return None
+        done = self.progress(now)
+        if done < self.MIN_ETA_PROGRESS:
+            return None
+        return (now - self.started_at) * (1 - done) / done
+
+    def active(self):
+        return [font['name'] for font in self.fonts.values() if font['state'] == 'downloading']
+
+    def row_text(self, font_key):
+        font = self.fonts[font_key]
+        text = f"{STATE_ICONS[font['state']]}  {font['name']}"
+        if font['bytes']:
+            text += f"  ({format_bytes(font['bytes'])})"
+        return text
+
+
+class ProgressPoller:
+    """
+    Thread-safe event sink for the GUI. put() is callable from any thread;
+    the Tk thread drains the queue every interval_ms and calls
+    render(model, changed_font_keys) once per frame when something changed.
+    """
+
+    def __init__(self, root, model, render, on_complete=None, interval_ms=FRAME_INTERVAL_MS):
+        self.root = root
+        self.model = model
+        self.render = render
+        self.on_complete = on_complete
+        self.interval_ms = interval_ms
+        self.events = queue.SimpleQueue()
+        self._after_id = None
+
+    def put(self, event):
+        self.events.put(event)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _poll(self):
+        self._after_id = None
+        complete = False
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event['type'] == 'downloads_complete':
+                complete = True
+            else:
+                self.model.apply(event)
+
+        changed = self.model.take_changes()
+        if changed:
+            self.render(self.model, changed)
+
+        if complete:
+            if self.on_complete:
+                self.on_complete()
+        else:
+            self._after_id = self.root.after(self.interval_ms, self._poll)
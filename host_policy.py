@@ -0,0 +1,207 @@
+"""
+Per-host request policy: rate limit, retries and a circuit breaker.
+Each host gets an optional token bucket (requests per second), transient
+failures (429/5xx, dropped connections) are retried with jittered
+exponential backoff that honours Retry-After, and a host that keeps failing
+is cut off by a circuit breaker so the rest of the run skips it right away
+instead of waiting out a timeout for every remaining font.
+"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+from download_engine import host_of, match_host
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5  # Seconds before the first retry, doubled each time
+DEFAULT_BACKOFF_MAX = 10.0
+DEFAULT_BREAKER_THRESHOLD = 3  # Requests in a row that failed after their retries before a host is skipped
+DEFAULT_BREAKER_COOLDOWN = 60.0  # Seconds before a tripped host gets one trial request
+
+
+class HostUnavailable(IOError):
+    """Raised instead of sending a request to a host whose circuit breaker is open"""
+
+
+def retry_after_seconds(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date), or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst saved up"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    closed -> open after threshold consecutive failed requests -> half-open after cooldown.
+    A failure is a whole request that gave up (retries used up, or a timeout), not one attempt.
+    """
+
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.trips = 0
+        self.skipped = 0
+        self.failure_seconds = []  # How long failed attempts took, to estimate time saved
+
+    def allow(self, now):
+        if self.opened_at is None:
+            return True
+        if now - self.opened_at >= self.cooldown and not self.trial_in_flight:
+            self.trial_in_flight = True  # Half-open: let one request through
+            return True
+        self.skipped += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self, now, seconds):
+        self.failure_seconds.append(seconds)
+        self.failures += 1
+        if self.trial_in_flight or (self.opened_at is None and self.failures >= self.threshold):
+            if not self.trial_in_flight:
+                self.trips += 1
+            self.opened_at = now
+            self.trial_in_flight = False
+
+    def time_saved(self):
+        if not self.skipped or not self.failure_seconds:
+            return 0.0
+        return self.skipped * sum(self.failure_seconds) / len(self.failure_seconds)
+
+
+class HostPolicy:
+    def __init__(self, rate_limits=None, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, breaker_threshold=DEFAULT_BREAKER_THRESHOLD,
+                 breaker_cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.rate_limits = dict(rate_limits or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        key, rate = match_host(host_of(url), self.rate_limits)
+        if not rate:
+            return None
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(rate)
+            return self._buckets[key]
+
+    def _breaker(self, host):
+        # Caller holds self._lock
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return self._breakers[host]
+
+    def before_request(self, url):
+        """Raise HostUnavailable if the host's breaker is open, otherwise wait for a rate-limit token"""
+        host = host_of(url)
+        with self._lock:
+            allowed = self._breaker(host).allow(time.monotonic())
+        if not allowed:
+            raise HostUnavailable(f"Skipping {host}: too many failures this run")
+        bucket = self._bucket(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    def record_success(self, url):
+        with self._lock:
+            self._breaker(host_of(url)).record_success()
+
+    def record_failure(self, url, seconds):
+        host = host_of(url)
+        with self._lock:
+            breaker = self._breaker(host)
+            was_open = breaker.opened_at is not None
+            breaker.record_failure(time.monotonic(), seconds)
+            tripped = breaker.opened_at is not None and not was_open
+        if tripped:
+            print(f"  🚧 {host} keeps failing, skipping it for the rest of the run")
+
+    def is_open(self, url):
+        with self._lock:
+            breaker = self._breakers.get(host_of(url))
+            return breaker is not None and breaker.opened_at is not None
+
+    def retry_delay(self, attempt, response=None):
+        """
+        Seconds to wait before retry number attempt (0-based), or None to give up.
+        Retry-After wins when present; asking for longer than backoff_max means give up.
+        """
+        if attempt >= self.max_retries:
+            return None
+        requested = retry_after_seconds(response)
+        if requested is not None:
+            return requested if requested <= self.backoff_max else None
+        # Full jitter: anywhere between 0 and the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def wait_before_retry(self, delay):
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        time.sleep(delay)
+
+    def stats(self):
+        """{'retries', 'backoff_seconds', 'tripped': {host: {'trips', 'skipped'}}, 'time_saved'}"""
+        with self._lock:
+            tripped = {host: {'trips': breaker.trips, 'skipped': breaker.skipped}
+                       for host, breaker in self._breakers.items() if breaker.trips}
+            time_saved = sum(breaker.time_saved() for breaker in self._breakers.values())
+            return {
+                'retries': self.retries,
+                'backoff_seconds': self.backoff_seconds,
+                'tripped': tripped,
+                'time_saved': time_saved,
+            }
@@ -0,0 +1,181 @@
+"""
+Persistent on-disk HTTP cache for CSS sheets, font files and ZIP archives.
+Entries are keyed by URL and keep their ETag / Last-Modified validators so
+the next run can revalidate with a conditional GET and get a 304 back
+instead of the full body. Total size is capped with LRU eviction.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+DEFAULT_CACHE_MAX_MB = 200
+INDEX_FILENAME = 'index.json'
+
+
+class HttpCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer at a time, they share the temp file
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries = self._load_index()
+        self._evict()  # The cap may have shrunk since the last run
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+        # Drop entries whose body went missing, and bodies nobody points to
+        entries = {url: entry for url, entry in entries.items()
+                   if os.path.exists(os.path.join(self.cache_dir, entry['file']))}
+        known_files = {entry['file'] for entry in entries.values()}
+        for name in os.listdir(self.cache_dir):
+            if name != INDEX_FILENAME and name not in known_files:
+                try:
+                    os.unlink(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        return entries
+
+    def save(self):
+        """Write the index to disk"""
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.entries, indent=1)
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.index_path)
+
+    def body_path(self, entry):
+        return os.path.join(self.cache_dir, entry['file'])
+
+    def lookup(self, url):
+        with self._lock:
+            entry = self.entries.get(url)
+            return dict(entry) if entry else None
+
+    def validators(self, entry):
+        """Conditional request headers for a cached entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record_hit(self, url):
+        """Server answered 304 for a cached URL"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry:
+                entry['last_used'] = time.time()
+                self.hits += 1
+                self.bytes_saved += entry['size']
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def copy_to(self, entry, dest_path):
+        """Materialize a cached body at dest_path (hard link when possible)"""
+        part_path = dest_path + '.part'
+        source = self.body_path(entry)
+        try:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            # Safe to share the inode: writers always replace files, never rewrite them in place
+            os.link(source, part_path)
+        except OSError:
+            shutil.copyfile(source, part_path)
+        os.replace(part_path, dest_path)
+
+    def read_bytes(self, entry):
+        with open(self.body_path(entry), 'rb') as f:
+            return f.read()
+
+    def _new_entry(self, url, headers, size, sha256):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return None  # Nothing to revalidate with, not worth caching
+        return {
+            'file': hashlib.sha256(url.encode('utf-8')).hexdigest(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': headers.get('content-type', ''),
+            'size': size,
+            'sha256': sha256,
+            'last_used': time.time(),
+        }
+
+    def store_file(self, url, path, headers, size, sha256):
+        """Add a downloaded file to the cache"""
+        entry = self._new_entry(url, headers, size, sha256)
+        if entry is None or size > self.max_bytes:
+            return
+        part_path = self.body_path(entry) + '.part'
+        try:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            os.link(path, part_path)
+        except OSError:
+            shutil.copyfile(path, part_path)
+        os.replace(part_path, self.body_path(entry))
+        self._add(url, entry)
+
+    def store_bytes(self, url, content, headers):
+        """Add an in-memory response body (CSS sheets) to the cache"""
+        entry = self._new_entry(url, headers, len(content), hashlib.sha256(content).hexdigest())
+        if entry is None or len(content) > self.max_bytes:
+            return
+        part_path = self.body_path(entry) + '.part'
+        with open(part_path, 'wb') as f:
+            f.write(content)
+        os.replace(part_path, self.body_path(entry))
+        self._add(url, entry)
+
+    def _add(self, url, entry):
+        with self._lock:
+            self.entries[url] = entry
+            self._evict()
+        # Saved with every new body: the next start deletes bodies the index doesn't know,
+        # so an interrupted run would otherwise lose everything it cached
+        self.save()
+
+    def _evict(self):
+        # Least recently used first until we're under the cap
+        total = sum(entry['size'] for entry in self.entries.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(self.body_path(entry))
+            except OSError:
+                pass
+            del self.entries[url]
+            total -= entry['size']
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry['size'] for entry in self.entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved}
@@ -0,0 +1,477 @@
+"""
+Shared HTTP session for FontDownloader.
+One long-lived requests.Session with keep-alive connection pools sized per
+host, so back-to-back requests to the same host reuse an open connection
+instead of paying a new TCP+TLS handshake every time.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import nullcontext
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from download_engine import HostLimiter, DEFAULT_HOST_LIMITS, DEFAULT_HOST_LIMIT
+from host_policy import HostPolicy, RETRY_STATUSES
+
+DEFAULT_HEADERS = {
+    # CSS sheets are served gzipped when asked, requests decodes them transparently
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Read size for streamed downloads, keeps peak memory flat regardless of file size
+CHUNK_SIZE = 64 * 1024
+
+# Seconds the current thread spent opening connections (DNS + TCP + TLS) since the last reset
+_connect_timing = threading.local()
+
+
+def _reset_connect_time():
+    _connect_timing.seconds = 0.0
+
+
+def _connect_time():
+    return getattr(_connect_timing, 'seconds', 0.0)
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.seconds = _connect_time() + time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.seconds = _connect_time() + time.perf_counter() - start
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def _record_timing(span, response, connect, total=None):
+    """Split a request into connect, server wait (TTFB) and body transfer seconds"""
+    first_byte = response.elapsed.total_seconds()
+    span['status'] = response.status_code
+    span['connect'] = connect
+    span['ttfb'] = max(0.0, first_byte - connect)
+    if total is not None:
+        span['transfer'] = max(0.0, total - first_byte)
+    if response.status_code >= 400:
+        span['ok'] = False
+
+
+class _UnsatisfiableResume(Exception):
+    """416 to a resume Range request; total is the file size from Content-Range, or None"""
+
+    def __init__(self, total):
+        super().__init__(total)
+        self.total = total
+
+
+def _range_total(response):
+    """N from a 'Content-Range: bytes */N' header, or None"""
+    _, _, total = response.headers.get('Content-Range', '').rpartition('/')
+    return int(total) if total.isdigit() else None
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report how long they took to open"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+class FontSession:
+    """Pooled session shared by every download thread"""
+
+    def __init__(self, host_limiter=None, pool_sizes=None, cache=None, latency_stats=None, tracer=None,
+                 policy=None):
+        self.host_limiter = host_limiter or HostLimiter()
+        self.policy = policy or HostPolicy()
+        self.cache = cache
+        self.latency_stats = latency_stats
+        self.tracer = tracer
+
+        # Pool size per host defaults to that host's connection cap
+        self.pool_sizes = dict(DEFAULT_HOST_LIMITS)
+        self.pool_sizes.update(self.host_limiter.host_limits)
+        if pool_sizes:
+            self.pool_sizes.update(pool_sizes)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self._adapters = []
+        self._mount_adapters()
+
+        self.request_count = 0
+        self.resumed_bytes = 0
+        self.on_first_response = None  # Called once, used by --startup-profile
+        self.on_bytes = None  # on_bytes(url, received, expected=None) as bodies arrive, used by the GUI
+        self._lock = threading.Lock()
+
+    def _new_adapter(self, pool_size):
+        adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+        self._adapters.append(adapter)
+        return adapter
+
+    def _mount_adapters(self):
+        # Fallback adapter for hosts without an explicit size
+        default_adapter = self._new_adapter(self.host_limiter.default_limit or DEFAULT_HOST_LIMIT)
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+
+        for host, size in self.pool_sizes.items():
+            adapter = self._new_adapter(size)
+            prefixes = [host]
+            # Bare domains usually serve from www. too (1001fonts.com -> www.1001fonts.com)
+            if host.count('.') == 1:
+                prefixes.append(f"www.{host}")
+            for prefix in prefixes:
+                self.session.mount(f"https://{prefix}/", adapter)
+                self.session.mount(f"http://{prefix}/", adapter)
+
+    def _span(self, name, url):
+        if self.tracer is None:
+            return nullcontext({})
+        return self.tracer.span(name, url)
+
+    def _send(self, url, send):
+        """
+        Call send() under the host policy: skip hosts whose breaker is open,
+        wait for a rate-limit token, retry 429/5xx and dropped connections with
+        backoff. Timeouts aren't retried, they already cost a full wait.
+        The breaker only hears about requests that failed once their retries
+        ran out (or timed out); 429s never count, Retry-After handles those.
+        Returns (response, retries, start of the last attempt).
+        Runs inside the host slot, so a throttling host also gets fewer parallel requests.
+        """
+        attempt = 0
+        while True:
+            self.policy.before_request(url)
+            _reset_connect_time()
+            start = time.perf_counter()
+            try:
+                response = send()
+            except requests.exceptions.Timeout:
+                self.policy.record_failure(url, time.perf_counter() - start)
+                raise
+            except requests.exceptions.ConnectionError:
+                delay = None if self.policy.is_open(url) else self.policy.retry_delay(attempt)
+                if delay is None:
+                    # Only a request that failed for good counts toward the breaker
+                    self.policy.record_failure(url, time.perf_counter() - start)
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.policy.record_success(url)
+                    return response, attempt, start
+                delay = None if self.policy.is_open(url) else self.policy.retry_delay(attempt, response)
+                if delay is None:
+                    # 429 is the host asking us to slow down (Retry-After), not the host being down
+                    if response.status_code == 429:
+                        self.policy.record_success(url)
+                    else:
+                        self.policy.record_failure(url, time.perf_counter() - start)
+                    return response, attempt, start
+                response.close()
+
+            with self._lock:
+                self.request_count += 1
+            self.policy.wait_before_retry(delay)
+            attempt += 1
+
+    def _request(self, method, url, span_name, **kwargs):
+        with self._span(span_name, url) as span:
+            with self.host_limiter.slot(url):
+                response, retries, start = self._send(url, lambda: self.session.request(method, url, **kwargs))
+                total = time.perf_counter() - start
+            with self._lock:
+                self.request_count += 1
+            _record_timing(span, response, _connect_time(), total)
+            if retries:
+                span['retries'] = retries
+            if method == 'GET':
+                span['bytes'] = len(response.content)
+                self._report_bytes(url, len(response.content))
+        return response
+
+    def _report_bytes(self, url, received, expected=None):
+        if self.on_bytes is not None:
+            self.on_bytes(url, received, expected)
+
+    def get(self, url, span_name='http_get', **kwargs):
+        """GET through the shared pool, holding a connection slot for the host"""
+        response = self._request('GET', url, span_name, **kwargs)
+        self._response_received(url, response)
+        return response
+
+    def _response_received(self, url, response):
+        # requests' elapsed is send -> headers parsed, i.e. time to first byte
+        if self.latency_stats is not None:
+            self.latency_stats.record(url, response.elapsed.total_seconds())
+
+        if self.on_first_response is not None:
+            with self._lock:
+                callback, self.on_first_response = self.on_first_response, None
+            if callback:
+                callback()
+
+    def head(self, url, **kwargs):
+        """HEAD through the shared pool, holding a connection slot for the host"""
+        kwargs.setdefault('allow_redirects', False)
+        return self._request('HEAD', url, 'http_head', **kwargs)
+
+    def fetch_text(self, url, timeout=15):
+        """
+        GET a small text resource (CSS) through the cache.
+        Returns the body text, or None if the server didn't answer 200/304.
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        headers = self.cache.validators(entry) if entry else {}
+
+        response = self.get(url, span_name='css_fetch', headers=headers, timeout=timeout)
+        if entry and response.status_code == 304:
+            self.cache.record_hit(url)
+            return self.cache.read_bytes(entry).decode('utf-8', errors='replace')
+        if response.status_code != 200:
+            return None
+
+        if self.cache:
+            self.cache.record_miss()
+            self.cache.store_bytes(url, response.content, response.headers)
+        return response.text
+
+    def _resumable_size(self, url, part_path, meta_path):
+        """(size, meta) of a partial download of url left by an earlier run, or (0, {})"""
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('url') == url:
+                return os.path.getsize(part_path), meta
+        except (OSError, ValueError):
+            pass
+        for stale_path in (part_path, meta_path):
+            try:
+                os.unlink(stale_path)
+            except OSError:
+                pass
+        return 0, {}
+
+    def fetch_to_file(self, url, dest_path, timeout=30, chunk_size=CHUNK_SIZE):
+        """
+        Stream url straight to dest_path without holding the body in memory.
+        Chunks go to dest_path + '.part' and are renamed into place once complete.
+        An interrupted .part from an earlier run is resumed with a Range request
+        when the server supports it; otherwise a cached copy is revalidated first
+        and reused on 304.
+        Returns {'path', 'size', 'sha256', 'content_type', 'from_cache'}.
+        """
+        with self._span('file_fetch', url) as span:
+            try:
+                result = self._fetch_to_file(url, dest_path, timeout, chunk_size, span)
+            except _UnsatisfiableResume as e:
+                # Handled outside the host slot, the fallback GET takes a slot of its own
+                with self._lock:
+                    self.request_count += 1
+                result = self._recover_partial(url, dest_path, timeout, chunk_size, span, e.total)
+            span['bytes'] = result['size']
+            span['from_cache'] = result['from_cache']
+            return result
+
+    def _fetch_to_file(self, url, dest_path, timeout, chunk_size, span):
+        part_path = dest_path + '.part'
+        meta_path = part_path + '.json'
+        sha256 = hashlib.sha256()
+        size = 0
+
+        resume_from, part_meta = self._resumable_size(url, part_path, meta_path)
+        entry = None
+        headers = {}
+        if resume_from:
+            headers['Range'] = f'bytes={resume_from}-'
+            # Only resume if the file hasn't changed since the partial was written
+            validator = part_meta.get('etag') or part_meta.get('last_modified')
+            if validator:
+                headers['If-Range'] = validator
+        elif self.cache:
+            entry = self.cache.lookup(url)
+            headers = self.cache.validators(entry) if entry else {}
+
+        with self.host_limiter.slot(url):
+            response, retries, start = self._send(
+                url, lambda: self.session.get(url, headers=headers, timeout=timeout, stream=True))
+            if retries:
+                span['retries'] = retries
+            with response:
+                _record_timing(span, response, _connect_time())
+                self._response_received(url, response)
+                if entry and response.status_code == 304:
+                    with self._lock:
+                        self.request_count += 1
+                    self.cache.record_hit(url)
+                    self.cache.copy_to(entry, dest_path)
+                    self._report_bytes(url, entry['size'], entry['size'])
+                    return {
+                        'path': dest_path,
+                        'size': entry['size'],
+                        'sha256': entry['sha256'],
+                        'content_type': entry['content_type'],
+                        'from_cache': True,
+                    }
+
+                if resume_from and response.status_code == 416:
+                    # Range starts at or past the end: the partial may already be the whole file
+                    raise _UnsatisfiableResume(_range_total(response))
+
+                response.raise_for_status()
+                content_type = response.headers.get('content-type', '')
+
+                mode = 'wb'
+                if resume_from and response.status_code == 206:
+                    content_range = response.headers.get('Content-Range', '')
+                    if not content_range.startswith(f'bytes {resume_from}-'):
+                        os.unlink(part_path)
+                        os.unlink(meta_path)
+                        raise IOError(f"Unexpected Content-Range '{content_range}' for {url}")
+
+                    # Server honoured the range: hash what we already have and append
+                    with open(part_path, 'rb') as f:
+                        for chunk in iter(lambda: f.read(chunk_size), b''):
+                            sha256.update(chunk)
+                    size = resume_from
+                    mode = 'ab'
+                    span['resumed_bytes'] = resume_from
+                    with self._lock:
+                        self.resumed_bytes += resume_from
+                    print(f"    Resuming {os.path.basename(dest_path)} at {resume_from} bytes")
+
+                # Remember which URL/version the partial belongs to
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'url': url,
+                               'etag': response.headers.get('ETag'),
+                               'last_modified': response.headers.get('Last-Modified')}, f)
+
+                try:
+                    self._report_bytes(url, 0, int(response.headers.get('Content-Length', '')))
+                except ValueError:
+                    pass
+
+                # Disk time is tracked separately from the network part of the transfer
+                write_seconds = 0.0
+                try:
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if not chunk:
+                                continue
+                            write_start = time.perf_counter()
+                            f.write(chunk)
+                            sha256.update(chunk)
+                            write_seconds += time.perf_counter() - write_start
+                            size += len(chunk)
+                            self._report_bytes(url, len(chunk))
+                except BaseException:
+                    # Keep a partial around so the next run can resume it
+                    if size == 0:
+                        for stale_path in (part_path, meta_path):
+                            try:
+                                os.unlink(stale_path)
+                            except OSError:
+                                pass
+                    raise
+            span['transfer'] = max(0.0, time.perf_counter() - start - response.elapsed.total_seconds()
+                                   - write_seconds)
+            span['write'] = write_seconds
+        with self._lock:
+            self.request_count += 1
+
+        os.replace(part_path, dest_path)
+        try:
+            os.unlink(meta_path)
+        except OSError:
+            pass
+        if self.cache:
+            self.cache.record_miss()
+            self.cache.store_file(url, dest_path, response.headers, size, sha256.hexdigest())
+        return {
+            'path': dest_path,
+            'size': size,
+            'sha256': sha256.hexdigest(),
+            'content_type': content_type,
+            'from_cache': False,
+        }
+
+    def _recover_partial(self, url, dest_path, timeout, chunk_size, span, total):
+        """
+        After a 416 to a resume request: keep the partial if it is already the
+        whole file, otherwise drop it and its metadata and fetch once from scratch
+        """
+        part_path = dest_path + '.part'
+        meta_path = part_path + '.json'
+        size = os.path.getsize(part_path)
+        if total is not None and total == size:
+            sha256 = hashlib.sha256()
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    sha256.update(chunk)
+            os.replace(part_path, dest_path)
+            try:
+                os.unlink(meta_path)
+            except OSError:
+                pass
+            span['resumed_bytes'] = size
+            self._report_bytes(url, size, size)
+            print(f"    {os.path.basename(dest_path)} was already complete from an earlier run")
+            return {'path': dest_path, 'size': size, 'sha256': sha256.hexdigest(),
+                    'content_type': '', 'from_cache': False}
+
+        print(f"    Partial {os.path.basename(dest_path)} doesn't match the server's file, downloading it again")
+        for stale_path in (part_path, meta_path):
+            try:
+                os.unlink(stale_path)
+            except OSError:
+                pass
+        return self._fetch_to_file(url, dest_path, timeout, chunk_size, span)
+
+    def pool_stats(self):
+        """Return {'requests', 'new_connections', 'reused_connections'} across all pools"""
+        new_connections = 0
+        pooled_requests = 0
+        for adapter in self._adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    continue
+                new_connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        return {
+            'requests': pooled_requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, pooled_requests - new_connections),
+        }
+
+    def close(self):
+        self.session.close()
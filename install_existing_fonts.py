@@ -2,14 +2,30 @@
 """
 Quick script to manually install the already downloaded fonts.
 Run this with admin privileges.
+
+--bulk decides by content hash and real font name (family and style from
+the font's name table) instead of file name, copies in parallel and
+registers everything in one batch.
+
+--pack FILE installs from a font pack (main.py --export-pack) instead of
+the downloaded_fonts folder, straight from the mapped file.
 """
 
 import os
 import sys
+import time
 import ctypes
-import winreg
 import shutil
+import argparse
 from ctypes import wintypes
+from concurrent.futures import ThreadPoolExecutor
+
+from font_install import get_backend, registry_name_for
+from font_index import FontIndex, INDEX_FILENAME, font_full_name
+from font_pack import FontPack, PackError, install_pack, split_patterns
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+DEFAULT_WORKERS = 8
 
 def is_admin():
     try:
@@ -19,6 +35,8 @@ def is_admin():
 
 def install_font(font_path):
     """Install a single font file with proper Windows API handling"""
+    import winreg
+
     if not os.path.exists(font_path):
         print(f"Font file not found: {font_path}")
         return False
@@ -51,19 +69,8 @@ def install_font(font_path):
         result = gdi32.AddFontResourceW(dest_path)
 
         if result > 0:
-            # Determine font type and create proper registry entry
-            font_name_no_ext = os.path.splitext(font_filename)[0]
-            font_extension = os.path.splitext(font_filename)[1].lower()
-
-            # Determine font type for registry
-            if font_extension == '.ttf':
-                font_type = '(TrueType)'
-            elif font_extension == '.otf':
-                font_type = '(OpenType)'
-            else:
-                font_type = '(TrueType)'  # Default fallback
-
-            registry_name = f"{font_name_no_ext} {font_type}"
+            # Registry entry from the font's real name (e.g. "Builder Sans Bold (TrueType)")
+            registry_name = registry_name_for(font_filename, font_full_name(dest_path))
 
             # Add to registry
             try:
@@ -100,7 +107,171 @@ def install_font(font_path):
         print(f"Error installing {font_filename}: {e}")
         return False
 
+def plan_bulk_install(sources, index, fonts_dir):
+    """
+    Decide what to do with each source font by content and real font name,
+    not by file name. sources is {path: info} from the FontIndex.
+    Returns (actions, skipped) where actions is a list of (kind, source, dest)
+    with kind 'copy' or 'replace', and skipped is a list of (source, installed path).
+    """
+    actions = []
+    skipped = []
+    planned_hashes = set()
+    for source, info in sorted(sources.items()):
+        font_filename = os.path.basename(source)
+        dest = os.path.join(fonts_dir, font_filename)
+
+        # Same bytes installed under any name, the same family/style under another
+        # file name, or the same bytes already planned under another name
+        same_bytes = index.by_hash(info['sha256'], fonts_dir)
+        same_face = index.by_face(info, fonts_dir)
+        if same_face and os.path.basename(same_face).lower() == font_filename.lower():
+            same_face = None  # Same file name: a newer version, replace it
+        if same_bytes or same_face or info['sha256'] in planned_hashes:
+            skipped.append((source, same_bytes or same_face))
+            continue
+
+        planned_hashes.add(info['sha256'])
+        if os.path.exists(dest):
+            actions.append(('replace', source, dest))
+        else:
+            actions.append(('copy', source, dest))
+    return actions, skipped
+
+
+def bulk_install(downloads_dir, backend, workers=DEFAULT_WORKERS):
+    """Index-driven install of every font in downloads_dir. Returns True if nothing failed."""
+    timings = {}
+
+    # Phase 1: bring the font index up to date for both folders (only new or changed files are read)
+    start = time.perf_counter()
+    index = FontIndex(os.path.join(downloads_dir, INDEX_FILENAME))
+    read_count = index.index_folder(downloads_dir, workers) + index.index_folder(backend.fonts_dir, workers)
+    sources = index.in_folder(downloads_dir)
+    actions, skipped = plan_bulk_install(sources, index, backend.fonts_dir)
+    timings['index'] = time.perf_counter() - start
+
+    # Phase 2: independent copies run in parallel
+    start = time.perf_counter()
+
+    def copy_one(action):
+        kind, source, dest = action
+        try:
+            shutil.copy2(source, dest)
+            return action, None
+        except OSError as e:
+            return action, e
+
+    copied = []
+    replaced = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (kind, source, dest), error in executor.map(copy_one, actions):
+            if error:
+                print(f"Error copying {os.path.basename(source)}: {error}")
+                failed.append(source)
+            else:
+                (replaced if kind == 'replace' else copied).append(dest)
+    timings['copy'] = time.perf_counter() - start
+
+    # Phase 3: register the new files and commit once
+    start = time.perf_counter()
+    for dest in copied + replaced:
+        try:
+            if not backend.stage(dest):
+                print(f"Failed to register: {os.path.basename(dest)}")
+                failed.append(dest)
+        except Exception as e:
+            print(f"Error registering {os.path.basename(dest)}: {e}")
+            failed.append(dest)
+    backend.commit()
+    timings['register'] = time.perf_counter() - start
+
+    # Index the copies now so the next run finds them unchanged
+    for dest in copied + replaced:
+        index.add(dest)
+    index.save()
+
+    print(f"\nSkipped (already installed): {len(skipped)}")
+    print(f"Copied: {len(copied)}")
+    print(f"Replaced: {len(replaced)}")
+    if failed:
+        print(f"Failed: {len(failed)}")
+    print(f"Indexed {len(sources)} source and {len(index.in_folder(backend.fonts_dir))} installed files "
+          f"({read_count} read, the rest unchanged since the last run)")
+    print("Timings: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+    return not failed
+
+
+def bulk_main(args):
+    backend = get_backend(args.backend, args.fonts_dir)
+    if backend is None or backend.fonts_dir is None:
+        print("No install backend for this platform, pass --backend and --fonts-dir")
+        return 1
+    if backend.name == 'windows' and not is_admin():
+        print("ERROR: This script needs to run as Administrator!")
+        return 1
+
+    downloads_dir = os.path.join(os.getcwd(), "downloaded_fonts")
+    if not os.path.exists(downloads_dir):
+        print(f"No downloaded_fonts folder found in {os.getcwd()}")
+        return 1
+
+    return 0 if bulk_install(downloads_dir, backend, args.workers) else 1
+
+
+def pack_main(args):
+    backend = get_backend(args.backend, args.fonts_dir)
+    if backend is None or (backend.fonts_dir is None and backend.name != 'fake'):
+        print("No install backend for this platform, pass --backend and --fonts-dir")
+        return 1
+    if backend.name == 'windows' and not is_admin():
+        print("ERROR: This script needs to run as Administrator!")
+        return 1
+
+    include = split_patterns(args.include)
+    start = time.perf_counter()
+    try:
+        with FontPack(args.pack) as pack:
+            entries = pack.select(include)
+            if not entries:
+                print(f"No fonts in {args.pack} match {', '.join(include)}")
+                return 1
+            print(f"Installing {len(entries)} of {len(pack)} fonts from {args.pack}...")
+            installed, failed = install_pack(pack, entries, backend, args.workers)
+    except (OSError, PackError) as e:
+        print(f"Can't read font pack: {e}")
+        return 1
+
+    print(f"\nInstalled: {len(installed)}")
+    if failed:
+        print(f"Failed: {len(failed)}")
+    print(f"Timings: {time.perf_counter() - start:.2f}s")
+    return 0 if not failed else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Install the fonts in downloaded_fonts")
+    parser.add_argument('--bulk', action='store_true',
+                        help="decide by content hash, copy in parallel, register in one batch")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="threads for hashing and copying in --bulk and --pack mode")
+    parser.add_argument('--backend', default='auto', choices=['auto', 'windows', 'fontconfig', 'fake'],
+                        help="install backend for --bulk and --pack mode")
+    parser.add_argument('--fonts-dir', help="target fonts folder for --bulk and --pack mode (default: the backend's)")
+    parser.add_argument('--pack', help="install from this font pack instead of downloaded_fonts")
+    parser.add_argument('--include', action='append', default=[],
+                        help="with --pack: only these font keys or file names (comma separated, wildcards allowed)")
+    return parser.parse_args(argv)
+
+
 def main():
+    args = parse_args()
+    if args.pack:
+        sys.exit(pack_main(args))
+    if args.bulk:
+        sys.exit(bulk_main(args))
+
     if not is_admin():
         print("ERROR: This script needs to run as Administrator!")
         print("Right-click and 'Run as Administrator'")
@@ -1,16 +1,43 @@
+import time
+STARTUP_TIME = time.perf_counter()  # Before any other import, for --startup-profile
+
 import os
 import sys
 import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
-import requests
-import zipfile
-import shutil
 import ctypes
-from ctypes import wintypes
-import tempfile
 import json
-import re
+import fnmatch
+import argparse
+import multiprocessing
+from urllib.parse import urlparse
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+from download_engine import DownloadEngine, HostLimiter, DEFAULT_CONCURRENCY
+from http_cache import HttpCache, DEFAULT_CACHE_MAX_MB
+from state_manifest import StateManifest
+from zip_extract import extract_fonts, DEFAULT_ZIP_WORKERS
+import remote_zip
+from css_fonts import parse_font_faces, plan_downloads, face_filename
+from mirrors import LatencyStats, MirrorSelector, LATENCY_FILENAME, DEFAULT_HEDGE_PERCENTILE
+from font_install import get_backend
+from tracing import Tracer, TRACE_FILENAME, DEFAULT_SLOWEST
+from woff_decode import WoffDecoder, DEFAULT_WOFF_WORKERS, WOFF2_AUTO
+from gui_progress import ProgressModel, ProgressPoller, format_bytes, format_duration
+from font_lock import FontLock, LOCK_FILENAME, is_gone
+from font_index import FontIndex, INDEX_FILENAME
+from scheduler import FontHistory, FontScheduler, HISTORY_FILENAME
+from warmup import Warmup, resolve_host, DEFAULT_WARMUP_WORKERS
+from pipeline import (InstallPipeline, DEFAULT_MEMORY_BUDGET_MB, DEFAULT_UNPACK_WORKERS, DEFAULT_INSTALL_WORKERS,
+                      DEFAULT_QUEUE_SIZE)
+from font_pack import FontPack, PackError, collect_pack_files, export_pack, install_pack, split_patterns
+from host_policy import (HostPolicy, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX,
+                         DEFAULT_BREAKER_THRESHOLD, DEFAULT_BREAKER_COOLDOWN)
+
+DEFAULT_CSS_TIMEOUT = 15
+DEFAULT_FILE_TIMEOUT = 30
+MAX_PARALLEL_FILES = 4  # Files of one font fetched at once (weights of a CSS family)
 
 # Fix DPI scaling on Windows
 if sys.platform == "win32":
@@ -22,38 +49,206 @@ if sys.platform == "win32":
         except:
             pass
 
-class FontDownloader:
-    def __init__(self):
-        self.config = self.load_config()
-        self.fonts = list(self.config['fonts'].keys())
+class StartupProfile:
+    """Wall-clock marks for the --startup-profile report"""
 
-        # Create downloads folder
-        self.downloads_dir = os.path.join(os.getcwd(), "downloaded_fonts")
-        os.makedirs(self.downloads_dir, exist_ok=True)
+    def __init__(self, start_time):
+        self.start_time = start_time
+        self.marks = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter()))
+
+    def report(self):
+        with self._lock:
+            if self.reported:
+                return
+            self.reported = True
+            marks = list(self.marks)
 
+        print("\n" + "="*50)
+        print("STARTUP PROFILE")
+        print("="*50)
+        previous = self.start_time
+        for phase, timestamp in marks:
+            print(f"  {phase:<20} {(timestamp - previous) * 1000:8.1f} ms")
+            previous = timestamp
+        print(f"  {'total':<20} {(previous - self.start_time) * 1000:8.1f} ms")
+        print("="*50)
+
+class FontDownloader:
+    def __init__(self, downloads_dir=None, install=True, defer_setup=False, startup_profile=None,
+                 config_path=None, trace_path=None, resolve=False, mirror_url=None, concurrency=None):
+        self.requested_downloads_dir = downloads_dir
+        self.requested_concurrency = concurrency
+        self.requested_mirror_url = mirror_url
+        self.config_path = config_path
+        self.config_dir = None
+        self.resolve = resolve
+        self.requested_trace_path = trace_path
+        self.install = install
+        self.startup_profile = startup_profile
+
+        self.config = None
+        self.fonts = []
         self.root = None
         self.progress_var = None
         self.status_label = None
         self.progress_bar = None
+        self.download_button = None
+        self.font_list = None
+        self.progress_poller = None
         self.success_count = 0
         self.failed_fonts = []
+        self.failed_font_keys = []
+
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.warmup = None
+        self.warmup_stats = None
+
+        # The GUI shows its window first and loads config/folders afterwards
+        if not defer_setup:
+            self.setup_state()
+
+    def setup_state(self):
+        """Load config.json and prepare folders, caches and run state"""
+        self.config = self.load_config()
+        self.fonts = list(self.config['fonts'].keys())
+
+        # Create downloads folder
+        self.downloads_dir = os.path.abspath(self.requested_downloads_dir or
+                                             os.path.join(os.getcwd(), "downloaded_fonts"))
+        os.makedirs(self.downloads_dir, exist_ok=True)
+
+        # What previous runs already downloaded and installed
+        self.manifest = StateManifest(self.downloads_dir)
+
+        # Concurrency settings (optional "download" section in config.json)
+        download_config = self.config.get('download', {})
+        self.concurrency = self.requested_concurrency or download_config.get('concurrency', DEFAULT_CONCURRENCY)
+        self.css_timeout = download_config.get('css_timeout', DEFAULT_CSS_TIMEOUT)
+        self.file_timeout = download_config.get('file_timeout', DEFAULT_FILE_TIMEOUT)
+        self.host_limiter = HostLimiter(download_config.get('host_limits'))
+
+        # Concrete file URLs and hashes pinned by --resolve, next to config.json. A onefile
+        # executable unpacks config.json to a temp folder deleted at exit, so it writes the
+        # lockfile next to the .exe and only reads the bundled copy until one exists there.
+        lock_name = download_config.get('lockfile', LOCK_FILENAME)
+        bundled_lock = None
+        if getattr(sys, 'frozen', False):
+            lock_path = os.path.join(os.path.dirname(os.path.abspath(sys.executable)), lock_name)
+            if self.config_dir:
+                bundled_lock = os.path.join(self.config_dir, lock_name)
+        else:
+            lock_path = os.path.join(self.config_dir or os.getcwd(), lock_name)
+        self.lock = FontLock(lock_path, resolve=self.resolve, fallback_path=bundled_lock)
+
+        # Rate limits, retries with backoff and a circuit breaker per host
+        self.policy = HostPolicy(download_config.get('rate_limits'),
+                                 download_config.get('max_retries', DEFAULT_MAX_RETRIES),
+                                 download_config.get('backoff_base', DEFAULT_BACKOFF_BASE),
+                                 download_config.get('backoff_max', DEFAULT_BACKOFF_MAX),
+                                 download_config.get('breaker_threshold', DEFAULT_BREAKER_THRESHOLD),
+                                 download_config.get('breaker_cooldown', DEFAULT_BREAKER_COOLDOWN))
+        self.zip_workers = download_config.get('zip_workers', DEFAULT_ZIP_WORKERS)
+        self.zip_range_fetch = download_config.get('zip_range_fetch', True)
+
+        # WOFF -> TTF/OTF conversion on a process pool, started the first time a web font shows up
+        self.woff_decoder = WoffDecoder(download_config.get('woff_workers', DEFAULT_WOFF_WORKERS),
+                                        download_config.get('woff2_decoder', WOFF2_AUTO))
+
+        # Batched font installation (registry + broadcast once per run)
+        self.installer = get_backend(download_config.get('install_backend', 'auto')) if self.install else None
+
+        # Family/style/hash of every font here and in the system fonts folder, kept between runs
+        self.font_index = FontIndex(os.path.join(self.downloads_dir, INDEX_FILENAME))
+        self.font_index_thread = None
+
+        # Download threads only fetch; extraction/WOFF conversion and installs run as their own stages
+        self.pipeline = InstallPipeline(self.unpack_font, self.install_job,
+                                        download_config.get('unpack_workers', DEFAULT_UNPACK_WORKERS),
+                                        download_config.get('install_workers', DEFAULT_INSTALL_WORKERS),
+                                        download_config.get('pipeline_queue', DEFAULT_QUEUE_SIZE),
+                                        download_config.get('memory_budget_mb', DEFAULT_MEMORY_BUDGET_MB) * 1024 * 1024)
+        self.engine = None
+
+        # Longest expected font first: durations from earlier runs, HEAD sizes for new fonts
+        self.history = FontHistory(os.path.join(self.downloads_dir, HISTORY_FILENAME))
+        self.scheduler = FontScheduler(self.history, self.probe_size, self.concurrency)
+        self.up_to_date_fonts = set()
+        self.estimated_seconds = 0.0
+        self.run_seconds = 0.0
+
+        # DNS, connections and CSS prepared while the window waits for the click ("warmup": false turns it off)
+        self.warmup_enabled = download_config.get('warmup', True)
+        self.warmup_workers = download_config.get('warmup_workers', DEFAULT_WARMUP_WORKERS)
+
+        # Bytes actually transferred vs full archive sizes for Range-fetched ZIPs
+        self.range_fetch_stats = {'archives': 0, 'bytes_transferred': 0, 'archive_bytes': 0}
+        self.stats_lock = threading.Lock()
+
+        # On-disk HTTP cache next to the downloads folder
+        self.cache_dir = os.path.join(os.path.dirname(self.downloads_dir), "font_cache")
+        cache_max_mb = download_config.get('cache_max_mb', DEFAULT_CACHE_MAX_MB)
+        self.cache = HttpCache(self.cache_dir, cache_max_mb * 1024 * 1024) if cache_max_mb > 0 else None
+
+        # Per-host latency history, used to order mirrors and time hedged requests
+        self.latency_stats = LatencyStats(os.path.join(self.downloads_dir, LATENCY_FILENAME))
+        self.mirrors = MirrorSelector(self.latency_stats,
+                                      download_config.get('hedge_percentile', DEFAULT_HEDGE_PERCENTILE))
+
+        self.pool_sizes = download_config.get('pool_sizes')
+
+        # Timing spans for every stage, written to a JSONL trace ("trace_file": "" turns the file off)
+        trace_file = self.requested_trace_path or download_config.get('trace_file', TRACE_FILENAME)
+        self.tracer = Tracer(os.path.join(self.downloads_dir, trace_file) if trace_file else None)
+        self.trace_slowest = download_config.get('trace_slowest', DEFAULT_SLOWEST)
+
+        if self.startup_profile:
+            self.startup_profile.mark('config')
+
+    @property
+    def session(self):
+        """Shared keep-alive session for CSS, font and ZIP requests, created (and requests imported) on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    from http_session import FontSession
+                    session = FontSession(self.host_limiter, self.pool_sizes, self.cache, self.latency_stats,
+                                          self.tracer, self.policy)
+                    if self.startup_profile:
+                        session.on_first_response = self.report_first_request
+                    self._session = session
+        return self._session
+
+    def report_first_request(self):
+        self.startup_profile.mark('first request')
+        self.startup_profile.report()
 
     def load_config(self):
         try:
             # Handle PyInstaller bundled resources
-            if getattr(sys, 'frozen', False):
+            if self.config_path:
+                # Explicit config (benchmarks, alternate font lists)
+                config_path = self.config_path
+            elif getattr(sys, 'frozen', False):
                 # Running as compiled executable
                 config_path = os.path.join(sys._MEIPASS, 'config.json')
             else:
                 # Running as script
                 config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
 
+            self.config_dir = os.path.dirname(os.path.abspath(config_path))
             with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                config = json.load(f)
         except Exception as e:
             print(f"Error loading config: {e}")
             # Fallback to hardcoded fonts if config fails
-            return {
+            config = {
                 "fonts": {
                     "Roboto": {"display_name": "Roboto", "urls": ["https://fonts.google.com/download?family=Roboto"]},
                     "Nunito": {"display_name": "Nunito", "urls": ["https://fonts.google.com/download?family=Nunito"]},
@@ -61,10 +256,31 @@ class FontDownloader:
                 }
             }
 
+        # A LAN mirror (--mirror or "mirror_url") is tried before the upstream URLs
+        mirror_url = self.requested_mirror_url or config.get('download', {}).get('mirror_url')
+        if mirror_url:
+            from font_mirror import mirror_font_url
+            for font_key, font_config in config['fonts'].items():
+                font_config['mirror'] = mirror_font_url(mirror_url, font_key)
+        return config
+
+    def select_fonts(self, include=None, exclude=None):
+        """Narrow self.fonts to keys matching any include pattern and no exclude pattern"""
+        def matches(font_key, patterns):
+            return any(fnmatch.fnmatch(font_key.lower(), pattern.lower()) for pattern in patterns)
+
+        fonts = list(self.config['fonts'].keys())
+        if include:
+            fonts = [font_key for font_key in fonts if matches(font_key, include)]
+        if exclude:
+            fonts = [font_key for font_key in fonts if not matches(font_key, exclude)]
+        self.fonts = fonts
+        return fonts
+
     def setup_gui(self):
         self.root = tk.Tk()
         self.root.title("Roblox Fonts Downloader")
-        self.root.geometry("400x200")
+        self.root.geometry("420x380")
         self.root.resizable(False, False)
 
         # Center the window
@@ -86,173 +302,144 @@ class FontDownloader:
         # Progress bar
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var,
-                                          maximum=len(self.fonts), length=300)
+                                          maximum=100, length=300)
         self.progress_bar.grid(row=2, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E))
 
+        # Per-font status list
+        list_frame = ttk.Frame(main_frame)
+        list_frame.grid(row=3, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.font_list = tk.Listbox(list_frame, height=8, activestyle='none')
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.font_list.yview)
+        self.font_list.config(yscrollcommand=scrollbar.set)
+        self.font_list.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        list_frame.columnconfigure(0, weight=1)
+        list_frame.rowconfigure(0, weight=1)
+
         # Download button
-        download_btn = ttk.Button(main_frame, text="Download Fonts",
-                                command=self.start_download)
-        download_btn.grid(row=3, column=0, pady=(0, 5), sticky=tk.W)
+        self.download_button = ttk.Button(main_frame, text="Download Fonts",
+                                          command=self.start_download)
+        self.download_button.grid(row=4, column=0, pady=(0, 5), sticky=tk.W)
 
         # Close button
-        close_btn = ttk.Button(main_frame, text="Close", command=self.root.quit)
-        close_btn.grid(row=3, column=1, pady=(0, 5), sticky=tk.E)
+        close_btn = ttk.Button(main_frame, text="Close", command=self.close_window)
+        close_btn.grid(row=4, column=1, pady=(0, 5), sticky=tk.E)
 
         # Configure grid weights
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-
-    def get_font_urls_from_css(self, css_url):
-        """Extract actual font file URLs from CSS"""
+        main_frame.rowconfigure(3, weight=1)
+        self.root.protocol("WM_DELETE_WINDOW", self.close_window)
+
+    def close_window(self):
+        self.stop_warmup()
+        self.root.quit()
+
+    def get_font_faces_from_css(self, css_url):
+        """Parse the @font-face rules of a CSS sheet and plan which files to fetch"""
+        if self.warmup:
+            font_faces = self.warmup.result(('css', css_url))
+            if font_faces:
+                return font_faces
+        return self.read_css_faces(css_url)
+
+    def read_css_faces(self, css_url):
         try:
-            response = requests.get(css_url, timeout=15)
-            if response.status_code != 200:
+            css_content = self.session.fetch_text(css_url, timeout=self.css_timeout)
+            if css_content is None:
                 return []
 
-            css_content = response.text
-
-            # Extract URLs from CSS using regex
-            url_pattern = r'src:\s*url\(([^)]+)\)'
-            urls = re.findall(url_pattern, css_content)
-
-            # Filter for TTF, OTF, WOFF2 files
-            font_urls = []
-            for url in urls:
-                url = url.strip('\'"')
-                if any(ext in url.lower() for ext in ['.ttf', '.otf', '.woff2', '.woff']):
-                    font_urls.append(url)
-
-            return font_urls
-        except:
+            # One file per weight/style, installable formats first, no duplicate URLs
+            return plan_downloads(parse_font_faces(css_content))
+        except Exception as e:
+            print(f"  Failed to read CSS {css_url}: {e}")
             return []
 
-    def download_font(self, font_key):
+    def download_font(self, font_key, tried=None):
+        """
+        Fetch stage for one font, network only. Returns True/False, or the
+        Future of the pipeline stages that unpack and install what was fetched.
+        tried holds sources already handed on whose files turned out unusable.
+        """
         font_config = self.config['fonts'][font_key]
         display_name = font_config['display_name']
         urls = font_config['urls']
+        tried = frozenset(tried or ())
 
-        print(f"\n{display_name}:")
+        print(f"\n{display_name}:" if not tried else f"\n{display_name}: trying the next source")
         last_error = None
 
+        # Don't start another font while the pipeline holds its whole byte budget
+        self.pipeline.budget.wait_for_room()
+
+        # Skip fonts that already landed on a previous run, just finish any pending installs
+        # (--resolve fetches everything again so every font gets pinned)
+        not_installed = None if self.lock.resolve or tried else self.manifest.check(font_key, urls)
+        if not_installed is not None:
+            print(f"  Up to date: {display_name}")
+            self.up_to_date_fonts.add(font_key)
+            if not not_installed:
+                return True
+            return self.handoff({'font_key': font_key, 'kind': 'pending', 'names': not_installed, 'bytes': 0},
+                                tried)
+
+        # LAN mirror first (--resolve goes upstream so the lockfile pins public URLs)
+        if font_config.get('mirror') and not self.lock.resolve and 'mirror' not in tried:
+            job = self.download_from_mirror(font_key, font_config['mirror'])
+            if job:
+                return self.handoff(job, tried | {'mirror'})
+
+        # Pinned in the lockfile: fetch exactly those files, no CSS round-trips
+        pinned = self.lock.get(font_key, urls) if 'lock' not in tried else None
+        if pinned:
+            job = self.download_pinned(font_key, pinned)
+            if job is False:
+                return False
+            if job:
+                return self.handoff(job, tried | {'lock'})
+            print(f"  Pinned source is gone, resolving {display_name} again")
+
+        # Fastest mirror first, based on latency seen in earlier runs
+        sources = [source for source in self.mirrors.order(urls) if source not in tried]
+
+        # Race the CSS sources: if one is slow to answer, the next mirror starts too
+        css_results = {}
+
+        def resolve_css(css_url):
+            # Runs on a hedging thread, keep the spans attributed to this font
+            with self.tracer.for_font(font_key):
+                css_results[css_url] = self.get_font_faces_from_css(css_url)
+            return css_results[css_url]
+
+        css_sources = [source for source in sources if 'css' in source]
+        if len(css_sources) > 1:
+            winner, _ = self.mirrors.hedged(css_sources, resolve_css)
+            if winner:
+                sources = [winner] + [source for source in sources if source != winner]
+
         # Try each URL source
-        for url in urls:
+        for url in sources:
             try:
                 if 'css' in url:
-                    # CSS endpoint - extract actual font URLs
-                    font_urls = self.get_font_urls_from_css(url)
-                    if not font_urls:
+                    # CSS endpoint - parse @font-face rules into the files worth fetching
+                    if url in css_results:
+                        font_faces = css_results[url]
+                    else:
+                        font_faces = self.get_font_faces_from_css(url)
+                    if not font_faces:
                         continue
 
-                    # Download and install each font file
-                    installed_any = False
-                    for font_url in font_urls:
-                        try:
-                            font_response = requests.get(font_url, timeout=30)
-                            font_response.raise_for_status()
-
-                            # Determine file extension
-                            if '.ttf' in font_url.lower():
-                                ext = '.ttf'
-                            elif '.otf' in font_url.lower():
-                                ext = '.otf'
-                            elif '.woff2' in font_url.lower():
-                                ext = '.woff2'
-                            elif '.woff' in font_url.lower():
-                                ext = '.woff'
-                            else:
-                                ext = '.ttf'  # default
-
-                            # Save font file to downloads folder
-                            font_filename = f"{display_name.replace(' ', '_')}_{len(font_urls)}_{ext.replace('.', '')}"
-                            if len(font_urls) > 1:
-                                font_filename = f"{display_name.replace(' ', '_')}_variant_{font_urls.index(font_url)+1}{ext}"
-                            else:
-                                font_filename = f"{display_name.replace(' ', '_')}{ext}"
-
-                            font_save_path = os.path.join(self.downloads_dir, font_filename)
-
-                            with open(font_save_path, 'wb') as f:
-                                f.write(font_response.content)
-
-                            print(f"  Downloaded: {font_filename} ({len(font_response.content)} bytes)")
-
-                            # Install font (TTF/OTF only, skip WOFF)
-                            if ext in ['.ttf', '.otf']:
-                                if self.install_font(font_save_path):
-                                    print(f"  Installed: {font_filename}")
-                                installed_any = True
-
-                        except Exception as e:
-                            print(f"Failed to download font file {font_url}: {str(e)}")
-                            continue
-
-                    if installed_any:
-                        return True
-
+                    # Download every face at once, the install stage takes it from there
+                    files = [{'url': face['url'], 'ext': face['ext'],
+                              'name': face_filename(display_name.replace(' ', '_'), face, len(font_faces))}
+                             for face in font_faces]
+                    job = self.files_job(font_key, url, self.fetch_files(font_key, files))
                 else:
-                    # Direct download URL (ZIP or TTF/OTF file)
-                    response = requests.get(url, timeout=30)
-                    response.raise_for_status()
-
-                    # Check if it's a ZIP file
-                    if response.content[:2] == b'PK' or 'zip' in response.headers.get('content-type', '').lower():
-                        # Create temporary file for the zip
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-                            temp_file.write(response.content)
-                            temp_zip_path = temp_file.name
-
-                        # Extract and install fonts
-                        try:
-                            with tempfile.TemporaryDirectory() as temp_dir:
-                                with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                                    zip_ref.extractall(temp_dir)
-
-                                # Find and install TTF files
-                                font_files = []
-                                for root, dirs, files in os.walk(temp_dir):
-                                    for file in files:
-                                        if file.lower().endswith(('.ttf', '.otf')):
-                                            font_files.append(os.path.join(root, file))
-
-                                if font_files:
-                                    for font_file in font_files:
-                                        # Save to downloads folder
-                                        font_filename = f"{display_name.replace(' ', '_')}_{os.path.basename(font_file)}"
-                                        font_save_path = os.path.join(self.downloads_dir, font_filename)
-                                        shutil.copy2(font_file, font_save_path)
-                                        print(f"  Downloaded: {font_filename} ({os.path.getsize(font_save_path)} bytes)")
-
-                                        # Install font
-                                        if self.install_font(font_save_path):
-                                            print(f"  Installed: {font_filename}")
-                                    return True
-                        except Exception as zip_error:
-                            print(f"    ZIP extraction failed: {zip_error}")
-
-                        # Clean up temp zip file
-                        try:
-                            os.unlink(temp_zip_path)
-                        except:
-                            pass
-                    else:
-                        # Direct font file
-                        print(f"    Detected direct font file")
-                        if url.lower().endswith(('.ttf', '.otf')):
-                            ext = '.ttf' if '.ttf' in url.lower() else '.otf'
-                            font_filename = f"{display_name.replace(' ', '_')}{ext}"
-                            font_save_path = os.path.join(self.downloads_dir, font_filename)
-
-                            with open(font_save_path, 'wb') as f:
-                                f.write(response.content)
-
-                            print(f"    Saved: {font_filename}")
-                            self.install_font(font_save_path)
-                            return True
-                        else:
-                            print(f"    Unknown file type for URL: {url}")
-                            continue
+                    job = self.download_direct(font_key, url)
+                if job:
+                    return self.handoff(job, tried | {url})
 
             except Exception as e:
                 last_error = e
@@ -263,130 +450,642 @@ class FontDownloader:
         print(f"Error downloading {display_name}: All URLs failed. Last error: {str(last_error)}")
         return False
 
-    def install_font(self, font_path):
-        try:
-            # Windows font installation
-            if sys.platform == "win32":
-                # Get the Windows fonts directory
-                fonts_dir = os.path.join(os.environ['WINDIR'], 'Fonts')
+    def probe_size(self, url):
+        """Content-Length of url from a HEAD request (redirects followed), or None"""
+        if self.warmup and self.warmup.has(('size', url)):
+            return self.warmup.result(('size', url))
+        return self.head_size(url)
 
-                # Copy font to fonts directory
-                font_name = os.path.basename(font_path)
-                dest_path = os.path.join(fonts_dir, font_name)
+    def head_size(self, url):
+        response = self.session.head(url, allow_redirects=True, timeout=self.css_timeout)
+        if response.status_code != 200:
+            return None
+        size = response.headers.get('Content-Length')
+        return int(size) if size and size.isdigit() else None
 
-                # Only copy if it doesn't exist
-                if not os.path.exists(dest_path):
-                    shutil.copy2(font_path, dest_path)
+    def start_warmup(self):
+        """
+        Speculative work for the idle window: look up every host, then HEAD the
+        archives (opening a pooled connection and sizing them for the schedule),
+        fetch the CSS of every font this run will download and HEAD one file on
+        each host the sheets and pinned files point to, so font bytes don't wait
+        for a TCP+TLS handshake after the click either
+        """
+        if not self.warmup_enabled:
+            return
+        self.start_font_index()
+        warmup = Warmup(self.warmup_workers)
+        tasks = []
+        for font_key in self.fonts:
+            font_config = self.config['fonts'][font_key]
+            urls = font_config['urls']
+            if not self.lock.resolve and self.manifest.recorded(font_key, urls):
+                continue
+            if font_config.get('mirror'):
+                tasks.append((font_config['mirror'], None))
+            pinned = self.lock.get(font_key, urls)
+            if pinned:
+                tasks.extend((file['url'], ('connect', None)) for file in pinned['files'])
+                continue
+            css_sources = [url for url in self.mirrors.order(urls) if 'css' in url]
+            if css_sources:
+                tasks.append((css_sources[0], ('css', None)))
+            if urls and 'css' not in urls[0]:
+                tasks.append((urls[0], ('size', self.head_size)))
+
+        # Hosts that CSS fetches and archive HEADs already connect to
+        connected = {urlparse(url).hostname for url, task in tasks if task and task[0] in ('css', 'size')}
+
+        def connect(url):
+            """One HEAD per file host not connected to yet, leaving a kept-alive connection in the pool"""
+            host = urlparse(url).hostname
+            if host and host not in connected:
+                warmup.add(('connect', host), self.session.head, url, timeout=self.css_timeout)
+
+        def warm_css(css_url):
+            font_faces = self.read_css_faces(css_url)
+            for face in font_faces:
+                connect(face['url'])
+            return font_faces
+
+        # Every lookup first, they are quick and the rest needs them
+        hosts = set()
+        for url, _ in tasks:
+            host = urlparse(url).hostname
+            if host and host not in hosts:
+                hosts.add(host)
+                warmup.add(('dns', host), resolve_host, url)
+        for url, task in tasks:
+            if task is None:
+                continue
+            kind, function = task
+            if kind == 'connect':
+                connect(url)
+            elif kind == 'css':
+                warmup.add((kind, url), warm_css, url)
+            else:
+                warmup.add((kind, url), function, url)
+        if warmup.futures:
+            self.warmup = warmup
+            warmup.start()
+
+    def stop_warmup(self):
+        """Cancel what the warm-up hasn't started; what it already has is still used"""
+        if self.warmup and not self.warmup.stopped.is_set():
+            self.warmup.stop()
+            self.warmup_stats = self.warmup.stats()
+
+    def schedule_fonts(self):
+        """Order self.fonts longest expected first, the estimates stay in self.scheduler.costs"""
+        probe_urls = {}
+        up_to_date = set()
+        for font_key in self.fonts:
+            urls = self.config['fonts'][font_key]['urls']
+            if not self.lock.resolve and self.manifest.recorded(font_key, urls):
+                up_to_date.add(font_key)
+            elif urls and 'css' not in urls[0]:
+                # Archives and direct font links can be sized up front, CSS families can't
+                probe_urls[font_key] = urls[0]
+        with self.tracer.span('schedule') as span:
+            order = self.scheduler.order(self.fonts, probe_urls, up_to_date)
+            span['probed'] = self.scheduler.probed
+        return order
+
+    def handoff(self, job, tried):
+        """Queue fetched files for the unpack and install stages, returns the Future of the result"""
+        job['tried'] = tried
+        return self.pipeline.submit(job)
+
+    def next_source(self, job):
+        """What was fetched is unusable: back to the download engine to try the font's next source"""
+        return self.engine.continue_font(job['font_key'], job['tried'])
+
+    def download_pinned(self, font_key, pinned):
+        """
+        Download a font exactly as the lockfile says, checking every hash.
+        Returns a pipeline job, False, or None when a pinned URL is gone and the font needs resolving again.
+        """
+        if pinned['kind'] == 'archive':
+            try:
+                return self.download_direct(font_key, pinned['source_url'], pinned['files']) or False
+            except Exception as e:
+                if is_gone(e):
+                    return None
+                print(f"Failed pinned archive {pinned['source_url']}: {e}")
+                return False
 
-                # Register the font with Windows
-                return self.register_font(dest_path)
+        fetched = self.fetch_files(font_key, pinned['files'])
+        if any(is_gone(result) for _, result in fetched):
+            return None
+        if not self.check_hashes(fetched, " (run with --resolve to accept the new file)"):
             return False
+        return self.files_job(font_key, pinned['source_url'], fetched)
 
+    def download_from_mirror(self, font_key, mirror_url):
+        """Fetch a font's files from a LAN mirror, hash-checked. Returns a pipeline job, or False to go upstream."""
+        try:
+            response = self.session.get(mirror_url, span_name='mirror_index', timeout=self.css_timeout)
+            if response.status_code != 200:
+                return False
+            entry = response.json()
         except Exception as e:
-            print(f"  Error installing font: {str(e)}")
+            print(f"  Mirror unavailable: {e}")
+            return False
+
+        fetched = self.fetch_files(font_key, entry['files'])
+        if not self.check_hashes(fetched):
             return False
+        print("  (from mirror)")
+        # Mirror URLs are local to this network, keep them out of the lockfile
+        return self.files_job(font_key, mirror_url, fetched, pin=False)
+
+    def check_hashes(self, fetched, hint=''):
+        """True if every file arrived with the expected SHA-256, bad files are deleted"""
+        for file, result in fetched:
+            if isinstance(result, Exception):
+                return False
+            if result['sha256'] != file['sha256']:
+                print(f"  Hash mismatch for {file['name']}, rejecting it{hint}")
+                os.unlink(result['path'])
+                return False
+        return True
 
-    def register_font(self, font_path):
+    def fetch_files(self, font_key, files):
         """
-        Improved font registration using Windows API best practices
+        Download a font's files ({'url', 'name', 'ext'}) into the downloads folder in parallel.
+        Returns [(file, result or the exception it failed with)] in the same order.
+        """
+        def fetch(file):
+            with self.tracer.for_font(font_key):
+                try:
+                    result = self.session.fetch_to_file(file['url'], os.path.join(self.downloads_dir, file['name']),
+                                                        timeout=self.file_timeout)
+                except Exception as e:
+                    print(f"Failed to download font file {file['url']}: {str(e)}")
+                    return file, e
+            print(f"  Downloaded: {file['name']} ({result['size']} bytes)")
+            return file, result
+
+        if len(files) <= 1:
+            return [fetch(file) for file in files]
+        with ThreadPoolExecutor(max_workers=min(len(files), MAX_PARALLEL_FILES),
+                                thread_name_prefix='font-file') as executor:
+            return list(executor.map(fetch, files))
+
+    def files_job(self, font_key, source_url, fetched, pin=True):
+        """Pipeline job for files fetch_files got, or None if none of them arrived"""
+        fetched = [(file, result) for file, result in fetched if not isinstance(result, Exception)]
+        if not fetched:
+            return None
+        return {'font_key': font_key, 'kind': 'files', 'source_url': source_url, 'fetched': fetched,
+                'pin': pin, 'bytes': sum(result['size'] for _, result in fetched)}
+
+    def download_direct(self, font_key, url, pinned_files=None):
+        """Download a ZIP archive or a single TTF/OTF link. Returns a pipeline job, or None."""
+        display_name = self.config['fonts'][font_key]['display_name']
+
+        # Remote ZIP: fetch only the font members with Range requests when possible
+        if self.zip_range_fetch and url.lower().endswith('.zip') and not (
+                self.cache and self.cache.lookup(url)):
+            try:
+                with self.tracer.span('range_extract', url) as span:
+                    remote = remote_zip.fetch_fonts(self.session, url, self.downloads_dir,
+                                                    name_prefix=f"{display_name.replace(' ', '_')}_",
+                                                    timeout=self.file_timeout)
+                    span['ok'] = bool(remote and remote['files'])
+            except Exception as range_error:
+                print(f"    Range fetch failed, downloading whole archive: {range_error}")
+                remote = None
+            if remote and remote['files']:
+                with self.stats_lock:
+                    self.range_fetch_stats['archives'] += 1
+                    self.range_fetch_stats['bytes_transferred'] += remote['bytes_transferred']
+                    self.range_fetch_stats['archive_bytes'] += remote['archive_size']
+                print(f"    Range fetch: {remote['bytes_transferred']} of "
+                      f"{remote['archive_size']} archive bytes transferred")
+                return {'font_key': font_key, 'kind': 'extracted', 'source_url': url,
+                        'extracted': remote['files'], 'pinned_files': pinned_files, 'pin': True,
+                        'bytes': sum(font_file['size'] for font_file in remote['files'])}
+
+        # Direct download URL (ZIP or TTF/OTF file), streamed to disk
+        download_path = os.path.join(self.downloads_dir, f"{display_name.replace(' ', '_')}.download")
+        result = self.session.fetch_to_file(url, download_path, timeout=self.file_timeout)
+
+        with open(download_path, 'rb') as f:
+            magic = f.read(2)
+
+        # Check if it's a ZIP file, the unpack stage extracts it
+        if magic == b'PK' or 'zip' in result['content_type'].lower():
+            return {'font_key': font_key, 'kind': 'archive', 'source_url': url, 'archive_path': download_path,
+                    'pinned_files': pinned_files, 'pin': True, 'bytes': result['size']}
+
+        # Direct font file
+        print(f"    Detected direct font file")
+        if not url.lower().endswith(('.ttf', '.otf')):
+            os.unlink(download_path)
+            print(f"    Unknown file type for URL: {url}")
+            return None
+
+        ext = '.ttf' if '.ttf' in url.lower() else '.otf'
+        font_filename = f"{display_name.replace(' ', '_')}{ext}"
+        font_save_path = os.path.join(self.downloads_dir, font_filename)
+
+        # Atomic rename into place, no second copy
+        with self.tracer.span('write'):
+            os.replace(download_path, font_save_path)
+
+        print(f"    Saved: {font_filename}")
+        result = dict(result, path=font_save_path)
+        return self.files_job(font_key, url, [({'url': url, 'name': font_filename, 'ext': ext}, result)])
+
+    def traced_download_font(self, font_key, tried=None):
+        """
+        download_font with every span below attributed to font_key. The font's own
+        span runs from font_started to font_finished (see run_downloads), so it
+        covers unpack and install too and ends with the final result.
+        """
+        with self.tracer.for_font(font_key):
+            return self.download_font(font_key, tried)
+
+    def unpack_font(self, job):
         """
+        Unpack stage: extract archives and convert web fonts. Returns the job
+        for the install stage, with job['fonts'] = [{'name', 'path', 'size',
+        'sha256', 'installable'}], or a final result.
+        """
+        with self.tracer.for_font(job['font_key']):
+            if job['kind'] == 'archive':
+                extracted = self.extract_archive(job)
+                if not extracted:
+                    return self.next_source(job)
+                job = dict(job, kind='extracted', extracted=extracted)
+
+            if job['kind'] == 'extracted':
+                if not self.matches_pins(job):
+                    return False
+                job['fonts'] = [{'name': os.path.basename(font_file['path']), 'path': font_file['path'],
+                                 'size': font_file['size'], 'sha256': font_file['sha256'], 'installable': True}
+                                for font_file in job['extracted']]
+                job['lock'] = ('archive', [{'name': font['name'], 'size': font['size'], 'sha256': font['sha256']}
+                                           for font in job['fonts']])
+            elif job['kind'] == 'files':
+                job['fonts'], lock_files = self.decode_files(job['fetched'])
+                job['lock'] = ('files', lock_files)
+            return job
+
+    def extract_archive(self, job):
+        """Extract only the font members of a downloaded archive, straight to their final names"""
+        display_name = self.config['fonts'][job['font_key']]['display_name']
         try:
-            import winreg
-
-            # Constants
-            FONTS_REG_PATH = r'SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts'
-            HWND_BROADCAST = 0xFFFF
-            WM_FONTCHANGE = 0x001D
-
-            # Setup Windows API calls with proper types
-            gdi32 = ctypes.windll.gdi32
-            user32 = ctypes.windll.user32
-
-            gdi32.AddFontResourceW.argtypes = [wintypes.LPCWSTR]
-            gdi32.AddFontResourceW.restype = ctypes.c_int
-
-            user32.SendMessageTimeoutW.argtypes = [
-                wintypes.HWND, wintypes.UINT, wintypes.WPARAM,
-                wintypes.LPARAM, wintypes.UINT, wintypes.UINT,
-                ctypes.POINTER(wintypes.DWORD)
-            ]
-
-            # Load the font resource
-            result = gdi32.AddFontResourceW(font_path)
-
-            if result > 0:
-                # Determine font type and create proper registry entry
-                font_filename = os.path.basename(font_path)
-                font_name_no_ext = os.path.splitext(font_filename)[0]
-                font_extension = os.path.splitext(font_filename)[1].lower()
-
-                # Determine font type for registry
-                if font_extension == '.ttf':
-                    font_type = '(TrueType)'
-                elif font_extension == '.otf':
-                    font_type = '(OpenType)'
-                else:
-                    font_type = '(TrueType)'  # Default fallback
+            with self.tracer.span('extract', job['source_url']) as span:
+                extracted = extract_fonts(job['archive_path'], self.downloads_dir,
+                                          name_prefix=f"{display_name.replace(' ', '_')}_",
+                                          max_workers=self.zip_workers)
+                span['files'] = len(extracted)
+            return extracted
+        except Exception as zip_error:
+            print(f"    ZIP extraction failed: {zip_error}")
+            return []
+        finally:
+            # Clean up downloaded archive
+            try:
+                os.unlink(job['archive_path'])
+            except:
+                pass
 
-                registry_name = f"{font_name_no_ext} {font_type}"
+    def matches_pins(self, job):
+        """Locked run: the archive has to produce exactly the pinned fonts"""
+        if job.get('pinned_files') is None:
+            return True
+        pinned = {entry['name']: entry['sha256'] for entry in job['pinned_files']}
+        produced = {os.path.basename(font_file['path']): font_file['sha256'] for font_file in job['extracted']}
+        if produced == pinned:
+            return True
+        for font_file in job['extracted']:
+            os.unlink(font_file['path'])
+        print(f"Failed pinned archive {job['source_url']}: no longer matches the lockfile "
+              f"(run with --resolve to accept it)")
+        return False
 
-                # Add to Windows registry for permanent installation
-                try:
-                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, FONTS_REG_PATH, 0, winreg.KEY_SET_VALUE) as key:
-                        winreg.SetValueEx(key, registry_name, 0, winreg.REG_SZ, font_filename)
-                except PermissionError:
-                    pass  # Silent fail on permission errors
-                except Exception:
-                    pass  # Silent fail on other registry errors
-
-                # Notify system with timeout to prevent hanging
-                try:
-                    timeout_result = wintypes.DWORD()
-                    user32.SendMessageTimeoutW(
-                        HWND_BROADCAST, WM_FONTCHANGE, 0, 0,
-                        0, 1000, ctypes.byref(timeout_result)  # 1 second timeout
-                    )
-                except Exception:
-                    # Fallback to simple SendMessage
-                    user32.SendMessageW(HWND_BROADCAST, WM_FONTCHANGE, 0, 0)
+    def decode_files(self, fetched):
+        """Convert fetched WOFF files on the decoder pool. Returns (fonts, lockfile entries)."""
+        fonts = []
+        lock_files = []
+        pending_decodes = []
+        for file, result in fetched:
+            font_filename = file['name']
+            ext = file['ext']
+            lock_files.append({'url': file['url'], 'name': font_filename, 'ext': ext,
+                               'size': result['size'], 'sha256': result['sha256']})
+
+            # Web-only formats are converted to TTF/OTF off-thread
+            if ext in ['.woff', '.woff2'] and self.woff_decoder.can_decode(ext):
+                future = self.woff_decoder.submit(result['path'], os.path.splitext(result['path'])[0])
+                pending_decodes.append((font_filename, result, future))
+                continue
 
-                return True
-            else:
-                return False
+            # Only TTF/OTF can be installed
+            fonts.append({'name': font_filename, 'path': result['path'], 'size': result['size'],
+                          'sha256': result['sha256'], 'installable': ext in ['.ttf', '.otf']})
+
+        for font_filename, result, future in pending_decodes:
+            fonts.append(self.finish_decode(font_filename, result, future))
+        return fonts, lock_files
 
+    def finish_decode(self, font_filename, result, future):
+        """Wait for a WOFF decode. Returns the font entry to install and keep."""
+        try:
+            with self.tracer.span('decode', file=font_filename) as span:
+                decoded = future.result()
+                span['seconds_in_worker'] = decoded['seconds']
+                span['bytes'] = decoded['size']
         except Exception as e:
-            print(f"Error registering font {font_path}: {str(e)}")
-            return False
+            # Keep the web font around, it just can't be installed
+            print(f"  Couldn't convert {font_filename}: {e}")
+            return {'name': font_filename, 'path': result['path'], 'size': result['size'],
+                    'sha256': result['sha256'], 'installable': False}
 
-    def download_fonts_thread(self):
-        self.success_count = 0
-        self.failed_fonts = []
+        decoded_filename = os.path.basename(decoded['path'])
+        print(f"  Converted: {font_filename} -> {decoded_filename}")
+        try:
+            os.unlink(result['path'])
+        except OSError:
+            pass
+        return {'name': decoded_filename, 'path': decoded['path'], 'size': decoded['size'],
+                'sha256': decoded['sha256'], 'installable': True}
+
+    def install_job(self, job):
+        """Install stage: stage every font with the backend, then record it in the manifest and lockfile"""
+        font_key = job['font_key']
+        with self.tracer.for_font(font_key):
+            if job['kind'] == 'pending':
+                for font_filename in job['names']:
+                    if self.install_font(os.path.join(self.downloads_dir, font_filename)):
+                        self.manifest.mark_installed(font_key, font_filename)
+                        print(f"  Installed: {font_filename}")
+                return True
 
-        for i, font_key in enumerate(self.fonts):
-            font_config = self.config['fonts'][font_key]
-            display_name = font_config['display_name']
+            # Nothing installable came out of this source (e.g. no WOFF2 decoder), try the next one
+            if not any(font['installable'] for font in job['fonts']):
+                return self.next_source(job)
+
+            saved_files = []
+            for font in job['fonts']:
+                installed = font['installable'] and self.install_font(font['path'])
+                if installed:
+                    print(f"  Installed: {font['name']}")
+                saved_files.append({'name': font['name'], 'size': font['size'],
+                                    'sha256': font['sha256'], 'installed': installed})
+
+            urls = self.config['fonts'][font_key]['urls']
+            self.manifest.record(font_key, urls, job['source_url'], saved_files)
+            if job['pin']:
+                lock_kind, lock_files = job['lock']
+                self.lock.pin(font_key, urls, job['source_url'], lock_kind, lock_files)
+            return True
 
-            self.root.after(0, lambda name=display_name: self.status_label.config(
-                text=f"Downloading {name}..."))
+    def install_font(self, font_path):
+        """Stage a font with the install backend, the batch is committed at the end of the run"""
+        if self.installer is None:
+            return False
+        font_filename = os.path.basename(font_path)
+        with self.tracer.span('install', file=font_filename) as span:
+            try:
+                installed_as = self.installed_copy(font_path)
+                if installed_as:
+                    print(f"  Already installed as {os.path.basename(installed_as)}")
+                    span['ok'] = True
+                    span['skipped'] = True
+                    return True
+                span['ok'] = self.installer.stage(font_path)
+                if span['ok'] and self.installer.fonts_dir:
+                    self.font_index.add(os.path.join(self.installer.fonts_dir, font_filename))
+                return span['ok']
+            except Exception as e:
+                print(f"  Error installing font: {str(e)}")
+                span['ok'] = False
+                return False
 
-            success = self.download_font(font_key)
+    def installed_copy(self, font_path):
+        """Path of a system font with the same bytes or the same family/style under another file name, or None"""
+        fonts_dir = self.installer.fonts_dir
+        if not fonts_dir:
+            return None
+        self.wait_for_font_index()
+        try:
+            installed = self.font_index.installed_copy(self.font_index.add(font_path), fonts_dir)
+        except (OSError, ValueError):
+            return None
+        if installed and os.path.basename(installed).lower() != os.path.basename(font_path).lower():
+            return installed
+        return None
+
+    def index_installed_fonts(self):
+        """Bring the font index of the system fonts folder up to date (only new or changed files are read)"""
+        if self.installer is None or not self.installer.fonts_dir:
+            return
+        with self.tracer.span('font_index') as span:
+            span['read'] = self.font_index.index_folder(self.installer.fonts_dir, self.concurrency)
+
+    def start_font_index(self):
+        """
+        Index the system fonts folder on a background thread, once per run. A first
+        run hashes the whole folder, downloads don't wait for that, only installs do.
+        """
+        if self.font_index_thread is None and self.installer is not None and self.installer.fonts_dir:
+            self.font_index_thread = threading.Thread(target=self.index_installed_fonts, name='font-index',
+                                                      daemon=True)
+            self.font_index_thread.start()
+
+    def wait_for_font_index(self):
+        thread = self.font_index_thread
+        if thread is not None:
+            thread.join()
+
+    def commit_installs(self):
+        """Registry writes and the font-change notification, once for the whole batch"""
+        if self.installer is None:
+            return
+        try:
+            with self.tracer.span('register') as span:
+                committed = self.installer.commit()
+                span['fonts'] = committed
+            if committed:
+                print(f"\nRegistered {committed} fonts with the system ({self.installer.name})")
+        except Exception as e:
+            print(f"Error committing font installs: {str(e)}")
 
-            if success:
-                self.success_count += 1
-            else:
-                self.failed_fonts.append(display_name)
+    def export_pack(self, pack_path):
+        """Pack every downloaded font into one file for offline machines"""
+        files = collect_pack_files(self.downloads_dir, self.manifest.fonts)
+        if not files:
+            print(f"No fonts in {self.downloads_dir} to pack, download them first")
+            return False
+        count, size = export_pack(files, pack_path)
+        print(f"📦 Packed {count} fonts ({format_bytes(size)}) into {pack_path}")
+        return True
+
+    def import_pack(self, pack_path, include=None, exclude=None):
+        """Install fonts straight from a font pack, no network. Returns True if nothing failed."""
+        if self.installer is None:
+            print("No install backend for this platform")
+            return False
+        try:
+            with FontPack(pack_path) as pack:
+                entries = pack.select(include, exclude)
+                if not entries:
+                    print(f"No fonts in {pack_path} match the include/exclude filters")
+                    return False
+                start = time.perf_counter()
+                installed, failed = install_pack(pack, entries, self.installer, self.concurrency)
+        except (OSError, PackError) as e:
+            print(f"Can't read font pack: {e}")
+            return False
+        print(f"📦 Installed {len(installed)}/{len(entries)} fonts from {os.path.basename(pack_path)} "
+              f"in {time.perf_counter() - start:.2f}s ({self.installer.name})")
+        return not failed
+
+    def handle_download_event(self, event):
+        """Queue a DownloadEngine progress event for the next GUI frame (any thread)"""
+        self.progress_poller.put(event)
+
+    def report_bytes(self, url, received, expected=None):
+        """Session byte counts, attributed to the font the calling thread is working on"""
+        font_key = self.tracer.current_font
+        if font_key is not None:
+            self.progress_poller.put({'type': 'bytes', 'font_key': font_key,
+                                      'bytes': received, 'expected': expected})
+
+    def fill_font_list(self):
+        self.font_list.delete(0, tk.END)
+        for font_key in self.fonts:
+            self.font_list.insert(tk.END, f"·  {self.config['fonts'][font_key]['display_name']}")
+
+    def render_progress(self, model, changed):
+        """Redraw once per frame: progress bar, status line and the font rows that changed"""
+        self.progress_var.set(model.progress() * 100)
+
+        active = model.active()
+        if active:
+            names = ', '.join(active[:2]) + (f" +{len(active) - 2}" if len(active) > 2 else '')
+            status = f"Downloading {names}..."
+        else:
+            status = "Finishing up..."
+        eta = model.eta()
+        eta_text = f" · about {format_duration(eta)} left" if eta is not None else ''
+        self.status_label.config(text=f"{status}  {model.completed}/{len(model.order)} · "
+                                      f"{format_bytes(model.total_bytes)}{eta_text}")
+
+        for font_key in changed:
+            index = model.order.index(font_key)
+            self.font_list.delete(index)
+            self.font_list.insert(index, model.row_text(font_key))
+            if model.fonts[font_key]['state'] == 'failed':
+                self.font_list.itemconfig(index, foreground='red')
+        if model.latest_started in changed:
+            self.font_list.see(model.order.index(model.latest_started))
+
+    def run_downloads(self, on_event=None):
+        """Download every selected font, then commit installs and persist run state"""
+        self.success_count = 0
+        self.failed_fonts = []
+        self.failed_font_keys = []
+        self.up_to_date_fonts = set()
+        started_at = {}
+
+        def count_event(event):
+            if event['type'] == 'font_started':
+                started_at[event['font_key']] = time.perf_counter()
+                self.tracer.start_font(event['font_key'])
+            if event['type'] == 'font_finished':
+                self.tracer.finish_font(event['font_key'], event['success'])
+                if event['success']:
+                    self.success_count += 1
+                    self.record_history(event['font_key'], time.perf_counter() - started_at[event['font_key']])
+                else:
+                    self.failed_fonts.append(self.config['fonts'][event['font_key']]['display_name'])
+                    self.failed_font_keys.append(event['font_key'])
+            if on_event:
+                on_event(event)
+
+        if self.startup_profile:
+            self.startup_profile.mark('idle until download')
+
+        self.tracer.open()
+        self.start_font_index()
+        order = self.schedule_fonts()
+        self.estimated_seconds = sum(self.scheduler.costs.values()) / max(1, self.concurrency)
+        count_event({'type': 'schedule', 'costs': dict(self.scheduler.costs),
+                     'eta': round(self.estimated_seconds, 1)})
+        self.pipeline.start()
+        self.engine = DownloadEngine(self.traced_download_font, concurrency=self.concurrency, on_event=count_event)
+        run_start = time.perf_counter()
+        self.engine.run(order)
+        self.run_seconds = time.perf_counter() - run_start
+        self.pipeline.stop()
+        self.woff_decoder.shutdown()
+        self.commit_installs()
+        self.tracer.close()
+        if self.lock.save():
+            print(f"\nLockfile updated: {self.lock.path}")
+
+        if self.cache:
+            self.cache.save()
+        self.latency_stats.save()
+        self.wait_for_font_index()
+        self.font_index_thread = None
+        self.font_index.save()
+        self.history.save()
+
+        # No response ever came back (offline?), still show what we measured
+        if self.startup_profile:
+            self.startup_profile.report()
+
+    def record_history(self, font_key, seconds):
+        """Remember how long a font that was actually downloaded took, for the next run's schedule"""
+        if font_key in self.up_to_date_fonts:
+            return
+        entry = self.manifest.fonts.get(font_key)
+        size = sum(info['size'] for info in entry['files'].values()) if entry else 0
+        self.history.record(font_key, seconds, size)
 
-            # Update progress bar
-            self.root.after(0, lambda: self.progress_var.set(i + 1))
+    def download_fonts_thread(self):
+        self.run_downloads(self.handle_download_event)
 
-        # Show completion message
-        self.root.after(0, self.show_completion_message)
+        # Show completion message, from the Tk thread on its next frame
+        self.progress_poller.put({'type': 'downloads_complete'})
 
-    def show_completion_message(self):
+    def run_headless(self, events_out=None):
+        """
+        Run without a window. Progress goes to events_out as JSON lines, the
+        human-readable log goes to stderr. Returns the process exit code.
+        """
+        events_out = events_out or sys.stdout
+        start_time = time.time()
+
+        def write_event(event):
+            record = {'event': event['type'], 'time': round(time.time() - start_time, 3)}
+            if 'font_key' in event:
+                record['font'] = event['font_key']
+                record['display_name'] = self.config['fonts'][event['font_key']]['display_name']
+            for key in ('success', 'completed', 'total', 'succeeded', 'failed', 'eta'):
+                if key in event:
+                    record[key] = event[key]
+            events_out.write(json.dumps(record) + "\n")
+            events_out.flush()
+
+        with redirect_stdout(sys.stderr):
+            self.run_downloads(write_event)
+            self.print_summary()
+
+        write_event({'type': 'summary', 'succeeded': self.success_count, 'failed': list(self.failed_font_keys),
+                     'total': len(self.fonts)})
+        return 1 if self.failed_fonts else 0
+
+    def print_summary(self):
+        """Console summary of the last run"""
         total_fonts = len(self.fonts)
-        failed_count = len(self.failed_fonts)
 
-        # Console output summary
         print("\n" + "="*50)
         print("INSTALLATION COMPLETE!")
         print("="*50)
@@ -395,10 +1094,69 @@ class FontDownloader:
         if self.failed_fonts:
             print(f"❌ Failed: {len(self.failed_fonts)} fonts")
 
+        if self._session:
+            pool_stats = self._session.pool_stats()
+            print(f"🔌 Connections: {pool_stats['new_connections']} new, "
+                  f"{pool_stats['reused_connections']} reused ({pool_stats['requests']} requests)")
+
+            if self._session.resumed_bytes:
+                print(f"⏩ Resumed: {self._session.resumed_bytes / (1024 * 1024):.1f} MB from partial downloads")
+
+        policy_stats = self.policy.stats()
+        if policy_stats['retries']:
+            print(f"🔁 Retries: {policy_stats['retries']} ({policy_stats['backoff_seconds']:.1f}s backing off)")
+        for host, tripped in policy_stats['tripped'].items():
+            print(f"🚧 Circuit breaker: {host} tripped {tripped['trips']}x, "
+                  f"{tripped['skipped']} requests skipped")
+        if policy_stats['tripped']:
+            print(f"   About {policy_stats['time_saved']:.0f}s of failing requests saved")
+
+        if self.mirrors.hedges_started:
+            print(f"🏁 Hedged requests: {self.mirrors.hedges_started} started, "
+                  f"{self.mirrors.backup_wins} won by a backup mirror")
+
+        if self.warmup_stats:
+            print(f"🔥 Warm-up: {self.warmup_stats['completed']}/{self.warmup_stats['queued']} lookups, "
+                  f"connections and CSS sheets ready before the click, {self.warmup.stats()['used']} used")
+
+        if self.run_seconds:
+            probed = f", {self.scheduler.probed} sizes probed" if self.scheduler.probed else ''
+            print(f"📐 Schedule: longest first, estimated {format_duration(self.estimated_seconds)}, "
+                  f"took {format_duration(self.run_seconds)}{probed}")
+
+        pipeline_stats = self.pipeline.stats()
+        stages = pipeline_stats['stages']
+        if stages['install']['items']:
+            print(f"🧵 Pipeline: unpack {stages['unpack']['busy_seconds']:.1f}s, "
+                  f"install {stages['install']['busy_seconds']:.1f}s busy, "
+                  f"peak {format_bytes(pipeline_stats['peak_bytes'])} in flight")
+            if pipeline_stats['budget_waits']:
+                print(f"   Memory budget held back downloads {pipeline_stats['budget_waits']}x "
+                      f"({pipeline_stats['budget_wait_seconds']:.1f}s)")
+
+        if self.range_fetch_stats['archives']:
+            print(f"📦 Range-fetched ZIPs: {self.range_fetch_stats['archives']}, "
+                  f"{self.range_fetch_stats['bytes_transferred'] / (1024 * 1024):.1f} MB transferred of "
+                  f"{self.range_fetch_stats['archive_bytes'] / (1024 * 1024):.1f} MB archives")
+
+        if self.cache:
+            cache_stats = self.cache.stats()
+            print(f"💾 Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['bytes_saved'] / (1024 * 1024):.1f} MB saved")
+
+        self.tracer.print_report(self.trace_slowest)
+
         print(f"\nFiles saved to: {self.downloads_dir}")
         print("\nFonts are now available in all applications!")
         print("="*50)
 
+    def show_completion_message(self):
+        total_fonts = len(self.fonts)
+        failed_count = len(self.failed_fonts)
+
+        # Console output summary
+        self.print_summary()
+
         # GUI message
         if failed_count == 0:
             message = (f"✅ Success! All {total_fonts} fonts have been downloaded and installed.\n\n"
@@ -423,10 +1181,18 @@ class FontDownloader:
 
     def start_download(self):
         # Disable the download button
-        for widget in self.root.winfo_children():
-            for child in widget.winfo_children():
-                if isinstance(child, ttk.Button) and child.cget('text') == 'Download Fonts':
-                    child.config(state='disabled')
+        self.download_button.config(state='disabled')
+
+        # Downloads get the connections from here on, the warm-up stops starting new work
+        self.stop_warmup()
+
+        # Worker threads only queue events, one Tk timer applies them per frame
+        model = ProgressModel([(font_key, self.config['fonts'][font_key]['display_name'])
+                               for font_key in self.fonts])
+        self.progress_poller = ProgressPoller(self.root, model, self.render_progress,
+                                              on_complete=self.show_completion_message)
+        self.progress_poller.start()
+        self.session.on_bytes = self.report_bytes
 
         # Start download in a separate thread
         download_thread = threading.Thread(target=self.download_fonts_thread)
@@ -434,8 +1200,23 @@ class FontDownloader:
         download_thread.start()
 
     def run(self):
+        # Show the window first, then load config and prepare folders
         self.setup_gui()
+        self.root.update()
+        if self.startup_profile:
+            self.startup_profile.mark('gui ready')
+
+        if self.config is None:
+            self.status_label.config(text="Loading font list...")
+            self.root.update_idletasks()
+            self.setup_state()
+            self.progress_bar.config(maximum=100)
+            self.status_label.config(text="Click 'Download Fonts' to begin")
+
+        self.fill_font_list()
+        self.start_warmup()
         self.root.mainloop()
+        self.stop_warmup()
 
 def request_admin_privileges():
     """Request administrator privileges by re-launching the script with elevated permissions"""
@@ -462,14 +1243,122 @@ def request_admin_privileges():
         return False
     return False
 
+def is_running_as_admin():
+    try:
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except:
+        return False
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download and install the Roblox Studio fonts")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without a window, print JSON-lines progress to stdout")
+    parser.add_argument('--jobs', type=int, help="number of fonts downloaded at once")
+    parser.add_argument('--css-timeout', type=float, help="seconds to wait for a CSS sheet")
+    parser.add_argument('--timeout', type=float, help="seconds to wait for a font or archive request")
+    parser.add_argument('--include', action='append', default=[],
+                        help="only these font keys from config.json (comma separated, wildcards allowed)")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="skip these font keys (comma separated, wildcards allowed)")
+    parser.add_argument('--output-dir', help="where downloaded fonts are saved (default: ./downloaded_fonts)")
+    parser.add_argument('--no-install', action='store_true', help="download only, don't install")
+    parser.add_argument('--resolve', action='store_true',
+                        help="fetch every font through its config.json sources and pin the files in fonts.lock.json")
+    parser.add_argument('--export-pack', metavar='FILE',
+                        help="pack the fonts in downloaded_fonts into one file for offline machines, then exit")
+    parser.add_argument('--import-pack', metavar='FILE',
+                        help="install fonts from a font pack instead of downloading (honours --include/--exclude)")
+    parser.add_argument('--mirror', metavar='URL',
+                        help="LAN mirror (another machine running --serve-mirror) to try before the upstream URLs")
+    parser.add_argument('--serve-mirror', nargs='?', const='', metavar='HOST:PORT',
+                        help="serve downloaded_fonts to other machines (default: every interface, the standard mirror port)")
+    parser.add_argument('--trace', help="JSONL file for per-font timing spans (default: downloaded_fonts/font_trace.jsonl)")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="print how long imports, config, GUI and the first request took")
+    return parser.parse_args(argv)
+
+def headless_main(args, profile=None):
+    """Unattended run for provisioning. Exit code 0 = all fonts ok, 1 = some failed, 2 = usage error"""
+    if sys.platform == "win32" and not args.no_install and not is_running_as_admin():
+        print("Headless install needs an elevated prompt (or pass --no-install)", file=sys.stderr)
+        return 2
+
+    with redirect_stdout(sys.stderr):
+        app = FontDownloader(downloads_dir=args.output_dir, install=not args.no_install,
+                             startup_profile=profile, trace_path=args.trace, resolve=args.resolve,
+                             mirror_url=args.mirror, concurrency=args.jobs)
+    if args.css_timeout:
+        app.css_timeout = args.css_timeout
+    if args.timeout:
+        app.file_timeout = args.timeout
+
+    if args.include or args.exclude:
+        app.select_fonts(split_patterns(args.include), split_patterns(args.exclude))
+    if not app.fonts:
+        print("No fonts in config.json match the include/exclude filters", file=sys.stderr)
+        return 2
+
+    return app.run_headless()
+
+def serve_mirror_main(args):
+    """--serve-mirror: share downloaded_fonts over HTTP until Ctrl+C"""
+    from font_mirror import MirrorServer, DEFAULT_MIRROR_ADDRESS
+    address = args.serve_mirror or DEFAULT_MIRROR_ADDRESS
+    host, _, port = address.rpartition(':')
+    downloads_dir = os.path.abspath(args.output_dir or os.path.join(os.getcwd(), "downloaded_fonts"))
+    try:
+        server = MirrorServer(downloads_dir, host or '0.0.0.0', int(port))
+    except (OSError, ValueError) as e:
+        print(f"Can't start the mirror on {address}: {e}")
+        return 2
+
+    fonts = server.index.font_keys()
+    print(f"🪞 Serving {len(fonts)} fonts from {downloads_dir} on http://{host or '0.0.0.0'}:{port}")
+    print(f"   Clients: python main.py --mirror http://<this machine>:{port}  (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"Sent {format_bytes(server.bytes_sent)}")
+    return 0
+
+def pack_main(args):
+    """--export-pack / --import-pack, no window and no network"""
+    if args.import_pack and sys.platform == "win32" and not is_running_as_admin():
+        print("Installing from a font pack needs an elevated prompt")
+        return 2
+
+    app = FontDownloader(downloads_dir=args.output_dir, install=bool(args.import_pack), concurrency=args.jobs)
+    if args.export_pack:
+        return 0 if app.export_pack(args.export_pack) else 1
+    return 0 if app.import_pack(args.import_pack, split_patterns(args.include),
+                                split_patterns(args.exclude)) else 1
+
 if __name__ == "__main__":
+    # WOFF decoding runs on a process pool, which needs this in a frozen executable
+    multiprocessing.freeze_support()
+    cli_args = parse_args()
+
+    startup_profile = None
+    if cli_args.startup_profile:
+        startup_profile = StartupProfile(STARTUP_TIME)
+        startup_profile.mark('imports')
+
+    if cli_args.serve_mirror is not None:
+        sys.exit(serve_mirror_main(cli_args))
+
+    if cli_args.export_pack or cli_args.import_pack:
+        sys.exit(pack_main(cli_args))
+
+    if cli_args.headless:
+        sys.exit(headless_main(cli_args, startup_profile))
+
     try:
         # Check if running as admin on Windows
         if sys.platform == "win32":
-            try:
-                is_admin = ctypes.windll.shell32.IsUserAnAdmin()
-            except:
-                is_admin = False
+            is_admin = is_running_as_admin()
 
             if not is_admin:
                 print("Administrator privileges required. Attempting to restart with elevated permissions...")
@@ -488,7 +1377,8 @@ if __name__ == "__main__":
         print("="*60)
         print("Starting application...")
 
-        app = FontDownloader()
+        app = FontDownloader(defer_setup=True, startup_profile=startup_profile, trace_path=cli_args.trace,
+                             resolve=cli_args.resolve, mirror_url=cli_args.mirror, concurrency=cli_args.jobs)
         app.run()
 
         # Wait for user input before closing (only for executable)
@@ -0,0 +1,151 @@
+"""
+Latency-aware source selection with hedged requests.
+Per-host time-to-first-byte samples are kept between runs and used to try
+the fastest mirror first. If a source hasn't answered within its host's
+usual latency (a percentile of past samples), the next source is started
+as well and whichever answers first wins.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+
+from download_engine import host_of
+
+LATENCY_FILENAME = 'host_latency.json'
+MAX_SAMPLES = 50
+MIN_SAMPLES = 5
+
+DEFAULT_HEDGE_PERCENTILE = 90
+DEFAULT_HEDGE_DELAY = 1.5  # Seconds, used until a host has enough samples
+MIN_HEDGE_DELAY = 0.25
+MAX_HEDGE_DELAY = 5.0
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyStats:
+    """Recent time-to-first-byte samples per host, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.samples = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {host: list(values)[-MAX_SAMPLES:] for host, values in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.samples)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    def record(self, url, seconds):
+        host = host_of(url)
+        with self._lock:
+            values = self.samples.setdefault(host, [])
+            values.append(round(seconds, 4))
+            del values[:-MAX_SAMPLES]
+
+    def host_samples(self, url):
+        with self._lock:
+            return list(self.samples.get(host_of(url), []))
+
+
+class MirrorSelector:
+    def __init__(self, latency_stats, hedge_percentile=DEFAULT_HEDGE_PERCENTILE):
+        self.latency = latency_stats
+        self.hedge_percentile = hedge_percentile
+        self._lock = threading.Lock()
+        self.hedges_started = 0
+        self.backup_wins = 0
+
+    def expected_latency(self, url):
+        samples = self.latency.host_samples(url)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return percentile(samples, 50)
+
+    def hedge_delay(self, url):
+        """How long to wait on url before also starting the next source"""
+        samples = self.latency.host_samples(url)
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        delay = percentile(samples, self.hedge_percentile)
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, delay))
+
+    def order(self, urls):
+        """Sources sorted fastest host first; hosts without history keep their config position"""
+        def sort_key(indexed):
+            index, url = indexed
+            latency = self.expected_latency(url)
+            return (latency if latency is not None else DEFAULT_HEDGE_DELAY, index)
+        return [url for _, url in sorted(enumerate(urls), key=sort_key)]
+
+    def hedged(self, urls, fetch):
+        """
+        Call fetch(url) on urls in order, starting the next one early when the
+        current one is slower than its hedge delay or as soon as it fails.
+        Returns (url, result) for the first truthy result, or (None, None).
+        Slower attempts still finish in the background; their results are dropped.
+        Attempts run on daemon threads, so a loser still waiting on a slow host
+        never holds the process open at exit.
+        """
+        results = queue.Queue()
+
+        def attempt(url):
+            try:
+                result = fetch(url)
+            except Exception:
+                result = None
+            results.put((url, result))
+
+        next_index = 0
+        in_flight = 0
+        deadline = None
+        start_next = True
+        hedging = False
+        while True:
+            if start_next and next_index < len(urls):
+                url = urls[next_index]
+                threading.Thread(target=attempt, args=(url,), name='font-hedge', daemon=True).start()
+                if hedging:
+                    with self._lock:
+                        self.hedges_started += 1
+                deadline = time.monotonic() + self.hedge_delay(url)
+                next_index += 1
+                in_flight += 1
+                start_next = False
+                hedging = False
+
+            if in_flight == 0:
+                return None, None
+
+            timeout = max(0, deadline - time.monotonic()) if next_index < len(urls) else None
+            try:
+                url, result = results.get(timeout=timeout)
+            except queue.Empty:
+                start_next = True  # Too slow, hedge with the next source
+                hedging = True
+                continue
+
+            in_flight -= 1
+            if result:
+                if url != urls[0]:
+                    with self._lock:
+                        self.backup_wins += 1
+                return url, result
+            start_next = True  # Failed, move on right away
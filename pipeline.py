@@ -0,0 +1,168 @@
+"""
+Staged download -> unpack -> install pipeline.
+The download engine's threads only do network I/O. What they fetched is
+handed to an unpack stage (ZIP extraction, WOFF conversion) and then an
+install stage (copy, font registration, manifest), each with its own
+workers and a bounded queue in front, so installing one font overlaps with
+fetching the next ones and a slow stage pushes back instead of piling up.
+
+A byte budget caps how much fetched-but-not-yet-installed payload is in
+the pipeline: once it's used up, no new font starts downloading until the
+install stage catches up.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+DEFAULT_UNPACK_WORKERS = 2
+DEFAULT_INSTALL_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+
+_STOP = object()
+
+
+class ByteBudget:
+    """Counts bytes in flight. One item is always let through, however big, so nothing deadlocks."""
+
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._cond = threading.Condition()
+
+    def _wait(self, blocked):
+        # Caller holds self._cond
+        if not blocked():
+            return
+        start = time.perf_counter()
+        self.waits += 1
+        while blocked():
+            self._cond.wait()
+        self.wait_seconds += time.perf_counter() - start
+
+    def acquire(self, size):
+        with self._cond:
+            self._wait(lambda: self.used and self.used + size > self.limit)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+
+    def release(self, size):
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+    def wait_for_room(self):
+        """Block while the budget is used up (called before starting a new fetch)"""
+        with self._cond:
+            self._wait(lambda: self.used >= self.limit)
+
+
+class Stage:
+    """Worker threads taking (job, future) items from a bounded queue"""
+
+    def __init__(self, name, handler, workers, queue_size, on_result):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.on_result = on_result
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, job, future):
+        """Queue a job, blocking while the queue is full"""
+        self.queue.put((job, future))
+        with self._lock:
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def stop(self):
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            job, future = item
+            start = time.perf_counter()
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                print(f"Unexpected error in {self.name} stage for {job.get('font_key')}: {e}")
+                result = False
+            with self._lock:
+                self.items += 1
+                self.busy_seconds += time.perf_counter() - start
+            self.on_result(self, job, future, result)
+
+
+class InstallPipeline:
+    """
+    submit(job) -> Future. unpack(job) returns the job for the install stage,
+    or a final result; install(job) returns the final result. A final result
+    is True/False, or another Future when the font went back to the download
+    engine to try its next source.
+    """
+
+    def __init__(self, unpack, install, unpack_workers=DEFAULT_UNPACK_WORKERS,
+                 install_workers=DEFAULT_INSTALL_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 memory_budget=DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024):
+        self.budget = ByteBudget(memory_budget)
+        self.unpack_stage = Stage('unpack', unpack, unpack_workers, queue_size, self._stage_done)
+        self.install_stage = Stage('install', install, install_workers, queue_size, self._stage_done)
+        self.started = False
+
+    def start(self):
+        if not self.started:
+            self.unpack_stage.start()
+            self.install_stage.start()
+            self.started = True
+
+    def stop(self):
+        """Wait for the workers to finish; everything submitted has resolved by the time the engine returns"""
+        if self.started:
+            self.unpack_stage.stop()
+            self.install_stage.stop()
+            self.started = False
+
+    def submit(self, job):
+        """Charge job['bytes'] to the budget and queue the job for unpacking"""
+        self.budget.acquire(job['bytes'])
+        future = Future()
+        self.unpack_stage.put(job, future)
+        return future
+
+    def _stage_done(self, stage, job, future, result):
+        if stage is self.unpack_stage and isinstance(result, dict):
+            self.install_stage.put(result, future)
+            return
+        self.budget.release(job['bytes'])
+        future.set_result(result)
+
+    def stats(self):
+        return {
+            'peak_bytes': self.budget.peak,
+            'budget_waits': self.budget.waits,
+            'budget_wait_seconds': self.budget.wait_seconds,
+            'stages': {stage.name: {'items': stage.items, 'busy_seconds': stage.busy_seconds,
+                                    'max_depth': stage.max_depth}
+                       for stage in (self.unpack_stage, self.install_stage)},
+        }
@@ -0,0 +1,136 @@
+"""
+Partial fetch of remote ZIP archives over HTTP Range requests.
+For servers that advertise Accept-Ranges, only the end-of-central-directory,
+the central directory and the byte ranges of the font members are
+transferred. Web kits, specimens and docs inside the archive are skipped.
+"""
+
+import io
+import os
+
+from zip_extract import font_members, extract_member
+
+# Each range request fetches at least this much, so zipfile's small reads don't each cost a round-trip
+READAHEAD_BYTES = 1024 * 1024
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class HttpRangeFile(io.RawIOBase):
+    """Read-only, seekable file object backed by HTTP Range requests"""
+
+    def __init__(self, session, url, size, timeout=30, readahead=READAHEAD_BYTES):
+        self.session = session
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        self.readahead = readahead
+        self.position = 0
+        self.bytes_transferred = 0
+        self._buffer = b''
+        self._buffer_start = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def _fetch(self, start, end):
+        response = self.session.get(self.url, span_name='range_get', headers={'Range': f'bytes={start}-{end}'},
+                                    timeout=self.timeout)
+        if response.status_code != 206:
+            raise RangeNotSupported(f"Expected 206 for range request, got {response.status_code}")
+        self.bytes_transferred += len(response.content)
+        self._buffer = response.content
+        self._buffer_start = start
+
+    def read(self, size=-1):
+        if self.position >= self.size:
+            return b''
+        if size is None or size < 0:
+            size = self.size - self.position
+        size = min(size, self.size - self.position)
+
+        buffer_end = self._buffer_start + len(self._buffer)
+        if not (self._buffer_start <= self.position and self.position + size <= buffer_end):
+            end = min(self.size, self.position + max(size, self.readahead)) - 1
+            self._fetch(self.position, end)
+
+        offset = self.position - self._buffer_start
+        data = self._buffer[offset:offset + size]
+        self.position += len(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def probe(session, url, timeout=15):
+    """
+    HEAD the URL (following redirects). Returns (final_url, size) if the
+    server supports byte ranges, otherwise None.
+    """
+    response = session.head(url, allow_redirects=True, timeout=timeout)
+    if response.status_code != 200:
+        return None
+    if response.headers.get('Accept-Ranges', '').lower() != 'bytes':
+        return None
+    try:
+        size = int(response.headers.get('Content-Length', ''))
+    except ValueError:
+        return None
+    if size <= 0:
+        return None
+    return response.url, size
+
+
+def fetch_fonts(session, url, dest_dir, name_prefix='', timeout=30):
+    """
+    Extract the font members of a remote ZIP using only Range requests.
+    Returns None if the server can't do ranges (the caller should download the
+    whole archive), otherwise {'files': [{'path', 'size', 'sha256'}, ...],
+    'bytes_transferred': n, 'archive_size': n}.
+    """
+    import zipfile
+
+    probed = probe(session, url, timeout=timeout)
+    if probed is None:
+        return None
+    final_url, archive_size = probed
+
+    remote = HttpRangeFile(session, final_url, archive_size, timeout=timeout)
+    try:
+        with zipfile.ZipFile(remote, 'r') as zip_ref:
+            files = []
+            for info in font_members(zip_ref):
+                # Fetch just this member: local header (name + extra field slack) plus its data
+                member_span = 30 + len(info.filename) + 1024 + info.compress_size
+                remote.readahead = min(READAHEAD_BYTES, member_span)
+                dest_path = os.path.join(dest_dir, f"{name_prefix}{os.path.basename(info.filename)}")
+                files.append(extract_member(zip_ref, info, dest_path))
+    except (RangeNotSupported, zipfile.BadZipFile):
+        return None
+
+    return {
+        'files': files,
+        'bytes_transferred': remote.bytes_transferred,
+        'archive_size': archive_size,
+    }
@@ -0,0 +1,134 @@
+"""
+Cost-aware font ordering.
+Each font gets an expected cost in seconds: its median duration in earlier
+runs, or for fonts never seen before an estimate from the Content-Length of
+a HEAD probe and the throughput seen so far. Fonts are started longest
+first, so a big archive can't be the straggler that starts last and sets
+the run's wall time. The same estimates weight the GUI progress and ETA.
+"""
+
+import os
+import json
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+HISTORY_FILENAME = 'font_history.json'
+MAX_SAMPLES = 5
+
+DEFAULT_FONT_SECONDS = 1.0  # Cost of a font with no history and no size, until there is history
+DEFAULT_BYTES_PER_SECOND = 1024 * 1024
+REQUEST_OVERHEAD_SECONDS = 0.3  # Connection setup and TTFB on top of the transfer itself
+UP_TO_DATE_SECONDS = 0.05  # Fonts the manifest already has only get checked
+
+
+class FontHistory:
+    """Recent (seconds, bytes) samples per font key, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.samples = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {font_key: [list(sample) for sample in values][-MAX_SAMPLES:]
+                        for font_key, values in json.load(f).items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.samples)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    def record(self, font_key, seconds, size):
+        with self._lock:
+            values = self.samples.setdefault(font_key, [])
+            values.append([round(seconds, 3), size])
+            del values[:-MAX_SAMPLES]
+
+    def expected_seconds(self, font_key):
+        """Median duration of earlier runs, or None"""
+        with self._lock:
+            values = self.samples.get(font_key)
+            return statistics.median(seconds for seconds, _ in values) if values else None
+
+    def throughput(self):
+        """Bytes per second over every recorded font (transfer plus install, per font)"""
+        with self._lock:
+            total_seconds = sum(seconds for values in self.samples.values() for seconds, _ in values)
+            total_bytes = sum(size for values in self.samples.values() for _, size in values)
+        return total_bytes / total_seconds if total_seconds > 0 and total_bytes > 0 else DEFAULT_BYTES_PER_SECOND
+
+    def typical_seconds(self):
+        with self._lock:
+            medians = [statistics.median(seconds for seconds, _ in values)
+                       for values in self.samples.values() if values]
+        return statistics.median(medians) if medians else DEFAULT_FONT_SECONDS
+
+
+class FontScheduler:
+    """
+    Orders fonts longest-first. probe(url) returns a Content-Length or None,
+    and is only called for fonts with no history.
+    """
+
+    def __init__(self, history, probe=None, max_probes=8):
+        self.history = history
+        self.probe = probe
+        self.max_probes = max_probes
+        self.costs = {}
+        self.probed = 0
+
+    def estimate(self, fonts, probe_urls=None, up_to_date=()):
+        """
+        {font_key: expected seconds}. probe_urls maps font keys without history to
+        a URL worth a HEAD request (direct archive/font links); up_to_date fonts are cheap.
+        """
+        probe_urls = probe_urls or {}
+        costs = {}
+        unknown = []
+        for font_key in fonts:
+            if font_key in up_to_date:
+                costs[font_key] = UP_TO_DATE_SECONDS
+                continue
+            seconds = self.history.expected_seconds(font_key)
+            if seconds is not None:
+                costs[font_key] = seconds
+            else:
+                unknown.append(font_key)
+
+        sizes = {}
+        to_probe = [font_key for font_key in unknown if probe_urls.get(font_key)]
+        if self.probe and to_probe:
+            def probe_one(font_key):
+                try:
+                    return font_key, self.probe(probe_urls[font_key])
+                except Exception:
+                    return font_key, None
+
+            with ThreadPoolExecutor(max_workers=max(1, self.max_probes),
+                                    thread_name_prefix='size-probe') as executor:
+                sizes = {font_key: size for font_key, size in executor.map(probe_one, to_probe) if size}
+            self.probed = len(to_probe)
+
+        bytes_per_second = self.history.throughput()
+        typical = self.history.typical_seconds()
+        for font_key in unknown:
+            if font_key in sizes:
+                costs[font_key] = REQUEST_OVERHEAD_SECONDS + sizes[font_key] / bytes_per_second
+            else:
+                costs[font_key] = typical
+        self.costs = costs
+        return costs
+
+    def order(self, fonts, probe_urls=None, up_to_date=()):
+        """Fonts sorted longest expected cost first (config order breaks ties)"""
+        costs = self.estimate(fonts, probe_urls, up_to_date)
+        position = {font_key: i for i, font_key in enumerate(fonts)}
+        return sorted(fonts, key=lambda font_key: (-costs[font_key], position[font_key]))
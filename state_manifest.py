@@ -0,0 +1,104 @@
+"""
+Installed-state manifest for incremental re-runs.
+Records, per font key, which source URL it came from and the name, size,
+SHA-256 and install status of every file it produced, so a re-run can
+skip fonts that already landed and only redo missing or changed ones.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+MANIFEST_FILENAME = 'font_state.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class StateManifest:
+    def __init__(self, downloads_dir):
+        self.downloads_dir = downloads_dir
+        self.path = os.path.join(downloads_dir, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer at a time, they share the temp file
+        self.fonts = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                return data.get('fonts', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps({'version': MANIFEST_VERSION, 'fonts': self.fonts}, indent=1)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+
+    def record(self, font_key, config_urls, source_url, files):
+        """
+        Store a finished font. files is a list of
+        {'name', 'size', 'sha256', 'installed'} dicts.
+        """
+        with self._lock:
+            self.fonts[font_key] = {
+                'urls': list(config_urls),
+                'source_url': source_url,
+                'files': {entry['name']: {'size': entry['size'],
+                                          'sha256': entry['sha256'],
+                                          'installed': entry['installed']}
+                          for entry in files},
+            }
+        self.save()
+
+    def mark_installed(self, font_key, filename):
+        with self._lock:
+            entry = self.fonts.get(font_key)
+            if entry and filename in entry['files']:
+                entry['files'][filename]['installed'] = True
+        self.save()
+
+    def recorded(self, font_key, config_urls):
+        """True if a previous run finished font_key from these URLs (no file checks, see check())"""
+        with self._lock:
+            entry = self.fonts.get(font_key)
+            return bool(entry and entry['urls'] == list(config_urls) and entry['files'])
+
+    def check(self, font_key, config_urls):
+        """
+        Compare the recorded state with what's on disk.
+        Returns None if the font has to be downloaded again, otherwise the
+        list of file names that are present but not yet installed.
+        """
+        with self._lock:
+            entry = self.fonts.get(font_key)
+            if not entry or entry['urls'] != list(config_urls) or not entry['files']:
+                return None
+            files = dict(entry['files'])
+
+        not_installed = []
+        for filename, info in files.items():
+            path = os.path.join(self.downloads_dir, filename)
+            try:
+                if os.path.getsize(path) != info['size'] or file_sha256(path) != info['sha256']:
+                    return None
+            except OSError:
+                return None
+            if not info['installed'] and filename.lower().endswith(('.ttf', '.otf')):
+                not_installed.append(filename)
+        return not_installed
@@ -0,0 +1,182 @@
+"""
+Per-font timing spans.
+Every stage of a font (CSS fetch, file fetch, extract, install, register)
+is recorded as a span with its duration and details such as the
+connect/TTFB/transfer split of a request. Spans are appended to a JSONL
+trace file as they finish and summarised at the end of the run.
+"""
+
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+TRACE_FILENAME = 'font_trace.jsonl'
+DEFAULT_SLOWEST = 5
+
+
+def _covered_seconds(intervals):
+    """Length of the union of (start, end) intervals"""
+    total = 0.0
+    covered_until = None
+    for start, end in sorted(intervals):
+        if covered_until is None or start > covered_until:
+            total += end - start
+            covered_until = end
+        elif end > covered_until:
+            total += end - covered_until
+            covered_until = end
+    return total
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.start_time = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file = None
+        self._font_starts = {}
+
+    def open(self):
+        """Start a new trace file (one per run)"""
+        self.run_id = uuid.uuid4().hex[:12]
+        self.start_time = time.perf_counter()
+        with self._lock:
+            self.spans = []
+            if self.path:
+                self._file = open(self.path, 'w', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    @property
+    def current_font(self):
+        return getattr(self._local, 'font_key', None)
+
+    @contextmanager
+    def for_font(self, font_key):
+        """Attribute spans opened on this thread to font_key"""
+        previous = self.current_font
+        self._local.font_key = font_key
+        try:
+            yield
+        finally:
+            self._local.font_key = previous
+
+    def start_font(self, font_key):
+        """Open font_key's 'font' span; it stays open across the fetch, unpack and install stages"""
+        with self._lock:
+            self._font_starts[font_key] = time.perf_counter()
+
+    def finish_font(self, font_key, ok):
+        """Close font_key's 'font' span with the font's final result"""
+        with self._lock:
+            start = self._font_starts.pop(font_key, None)
+        if start is not None:
+            self._finish('font', None, start, time.perf_counter() - start, None, {'ok': ok}, font_key)
+
+    @contextmanager
+    def span(self, name, url=None, **details):
+        """
+        Time a stage. Yields a dict the caller can add details to
+        (bytes, status, connect/ttfb/transfer seconds...).
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield details
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._finish(name, url, start, time.perf_counter() - start, error, details)
+
+    def _finish(self, name, url, start, duration, error, details, font_key=None):
+        record = {
+            'run': self.run_id,
+            'font': font_key or self.current_font,
+            'span': name,
+            'start': round(start - self.start_time, 4),
+            'duration': round(duration, 4),
+            'ok': error is None and details.pop('ok', True),
+        }
+        if url:
+            record['url'] = url
+        if error:
+            record['error'] = error
+        for key, value in details.items():
+            record[key] = round(value, 4) if isinstance(value, float) else value
+
+        line = json.dumps(record)
+        with self._lock:
+            self.spans.append(record)
+            if self._file:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def stage_totals(self):
+        """{span name: {'count', 'total', 'max'}} over every span except whole fonts"""
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            if record['span'] == 'font':
+                continue
+            stage = totals.setdefault(record['span'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            stage['count'] += 1
+            stage['total'] += record['duration']
+            stage['max'] = max(stage['max'], record['duration'])
+        return totals
+
+    def slowest_fonts(self, count=DEFAULT_SLOWEST):
+        """
+        The count slowest fonts as (font_key, duration, {stage: seconds}). A stage's
+        seconds are wall time within the font's span: files fetched in parallel count
+        once, and a losing hedged request still running after the font finished doesn't count.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        font_spans = sorted((record for record in spans if record['span'] == 'font'),
+                            key=lambda record: record['duration'], reverse=True)[:count]
+        slowest = []
+        for font_span in font_spans:
+            font_start = font_span['start']
+            font_end = font_start + font_span['duration']
+            intervals = {}
+            for record in spans:
+                if record['font'] == font_span['font'] and record['span'] != 'font':
+                    start = max(record['start'], font_start)
+                    end = min(record['start'] + record['duration'], font_end)
+                    intervals.setdefault(record['span'], []).append((start, max(start, end)))
+            breakdown = {name: _covered_seconds(stage_intervals) for name, stage_intervals in intervals.items()}
+            slowest.append((font_span['font'], font_span['duration'], breakdown))
+        return slowest
+
+    def print_report(self, count=DEFAULT_SLOWEST):
+        """Time per stage and the slowest fonts with where their time went"""
+        totals = self.stage_totals()
+        if not totals:
+            return
+
+        print(f"\n⏱  Time by stage:")
+        print(f"  {'stage':<16}{'count':>7}{'total s':>10}{'max s':>9}")
+        for name, stage in sorted(totals.items(), key=lambda item: item[1]['total'], reverse=True):
+            print(f"  {name:<16}{stage['count']:>7}{stage['total']:>10.2f}{stage['max']:>9.2f}")
+
+        slowest = self.slowest_fonts(count)
+        if slowest:
+            print(f"\n🐢 Slowest {len(slowest)} fonts:")
+            for font_key, duration, breakdown in slowest:
+                stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in
+                                   sorted(breakdown.items(), key=lambda item: item[1], reverse=True)[:3])
+                print(f"  {font_key:<24}{duration:>7.2f}s  {stages}")
+
+        if self.path:
+            print(f"\nTrace: {self.path}")
@@ -0,0 +1,109 @@
+"""
+Speculative warm-up while the window waits for the click.
+Between the window showing up and "Download Fonts" being pressed the
+process is idle, so the network work every run starts with is done then:
+DNS lookups for every host, a HEAD to every archive (which opens a pooled
+keep-alive connection and sizes it for the scheduler) and fetching and
+parsing each font's CSS sheet. Results are keyed, and the download looks
+them up instead of asking the network again.
+
+Nothing here is required: stop() drops whatever hasn't started (window
+closed, or the download began), a failed task just leaves no result, and
+results still in flight are waited for rather than fetched twice.
+"""
+
+import queue
+import socket
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import Future
+
+DEFAULT_WARMUP_WORKERS = 4
+
+_STOP = object()
+
+
+def resolve_host(url):
+    """Look the host of url up once, so the OS resolver cache has it when the download starts"""
+    parsed = urlparse(url)
+    socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                       type=socket.SOCK_STREAM)
+    return True
+
+
+class Warmup:
+    """
+    Runs (key, function) tasks in order on daemon threads. result(key) is the
+    function's return value, None if it failed, was dropped or never queued.
+    """
+
+    def __init__(self, workers=DEFAULT_WARMUP_WORKERS):
+        self.workers = max(1, int(workers))
+        self.futures = {}
+        self.completed = 0
+        self.used = 0
+        self.stopped = threading.Event()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def add(self, key, function, *args, **kwargs):
+        """Queue a task, unless one with this key already is"""
+        with self._lock:
+            if key in self.futures or self.stopped.is_set():
+                return
+            future = Future()
+            self.futures[key] = future
+        self._queue.put((future, function, args, kwargs))
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"warmup-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Drop the tasks that haven't started. Doesn't wait for the ones in flight (requests time out on their own)."""
+        self.stopped.set()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        with self._lock:
+            for future in self.futures.values():
+                future.cancel()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP or self.stopped.is_set():
+                return
+            future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception:
+                future.set_result(None)
+            with self._lock:
+                self.completed += 1
+
+    def has(self, key):
+        """True if a task for key ran or is running (its result may still be None)"""
+        with self._lock:
+            future = self.futures.get(key)
+        return future is not None and not future.cancelled()
+
+    def result(self, key):
+        """What the task for key returned, waiting for it if it is still running"""
+        with self._lock:
+            future = self.futures.get(key)
+        if future is None or future.cancelled():
+            return None
+        result = future.result()
+        if result is not None:
+            with self._lock:
+                self.used += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'queued': len(self.futures), 'completed': self.completed, 'used': self.used}
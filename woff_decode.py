@@ -0,0 +1,203 @@
+"""
+WOFF to TTF/OTF decoding, so web-only CSS sources are still installable.
+WOFF 1.0 is decoded with zlib alone: tables are inflated, the sfnt table
+directory is rebuilt with fresh checksums and head.checkSumAdjustment is
+recomputed. WOFF2 needs Brotli plus glyf reconstruction, so it goes through
+a pluggable decoder ('module:function', fontTools' by default when installed).
+Files are decoded on a process pool since inflating is CPU-bound.
+"""
+
+import io
+import os
+import time
+import zlib
+import struct
+import hashlib
+import importlib
+import threading
+
+WOFF_SIGNATURE = b'wOFF'
+WOFF2_SIGNATURE = b'wOF2'
+WOFF_HEADER_SIZE = 44
+WOFF_DIRECTORY_ENTRY_SIZE = 20
+HEAD_ADJUSTMENT_OFFSET = 8
+CHECKSUM_MAGIC = 0xB1B0AFBA
+
+DEFAULT_WOFF_WORKERS = min(4, os.cpu_count() or 1)
+WOFF2_AUTO = 'auto'
+FONTTOOLS_WOFF2_DECODER = 'woff_decode:decode_woff2_fonttools'
+
+
+class WoffError(ValueError):
+    pass
+
+
+def table_checksum(data):
+    data += b'\x00' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+
+def build_sfnt(flavor, tables):
+    """Assemble an sfnt from {tag: data}: sorted directory, 4-byte aligned tables, fixed checksums"""
+    tags = sorted(tables)
+    num_tables = len(tags)
+    entry_selector = max(0, num_tables.bit_length() - 1)
+    search_range = (1 << entry_selector) * 16
+    header = flavor + struct.pack('>HHHH', num_tables, search_range, entry_selector,
+                                  num_tables * 16 - search_range)
+
+    offset = 12 + 16 * num_tables
+    directory = []
+    body = []
+    head_offset = None
+    for tag in tags:
+        data = tables[tag]
+        if tag == b'head' and len(data) >= HEAD_ADJUSTMENT_OFFSET + 4:
+            # checkSumAdjustment is zero while checksums are computed
+            data = data[:HEAD_ADJUSTMENT_OFFSET] + b'\x00\x00\x00\x00' + data[HEAD_ADJUSTMENT_OFFSET + 4:]
+            head_offset = offset
+        directory.append(tag + struct.pack('>III', table_checksum(data), offset, len(data)))
+        padded = data + b'\x00' * (-len(data) % 4)
+        body.append(padded)
+        offset += len(padded)
+
+    font = bytearray(header + b''.join(directory) + b''.join(body))
+    if head_offset is not None:
+        adjustment = (CHECKSUM_MAGIC - table_checksum(bytes(font))) & 0xFFFFFFFF
+        struct.pack_into('>I', font, head_offset + HEAD_ADJUSTMENT_OFFSET, adjustment)
+    return bytes(font)
+
+
+def decode_woff(data):
+    """WOFF 1.0 bytes -> (sfnt bytes, flavor)"""
+    if len(data) < WOFF_HEADER_SIZE or data[:4] != WOFF_SIGNATURE:
+        raise WoffError("Not a WOFF file")
+    flavor = data[4:8]
+    length, num_tables = struct.unpack('>IH', data[8:14])
+    if length != len(data) or num_tables == 0:
+        raise WoffError("Truncated or empty WOFF file")
+
+    directory_end = WOFF_HEADER_SIZE + num_tables * WOFF_DIRECTORY_ENTRY_SIZE
+    if directory_end > len(data):
+        raise WoffError("WOFF table directory runs past the end of the file")
+
+    tables = {}
+    for index in range(num_tables):
+        entry = WOFF_HEADER_SIZE + index * WOFF_DIRECTORY_ENTRY_SIZE
+        tag = data[entry:entry + 4]
+        offset, comp_length, orig_length, _ = struct.unpack('>IIII', data[entry + 4:entry + 20])
+        if offset + comp_length > len(data) or comp_length > orig_length:
+            raise WoffError(f"Bad WOFF table entry {tag!r}")
+
+        table = data[offset:offset + comp_length]
+        if comp_length < orig_length:
+            try:
+                table = zlib.decompress(table)
+            except zlib.error as e:
+                raise WoffError(f"Can't inflate WOFF table {tag!r}: {e}")
+        if len(table) != orig_length:
+            raise WoffError(f"WOFF table {tag!r} is {len(table)} bytes, expected {orig_length}")
+        tables[tag] = table
+
+    return build_sfnt(flavor, tables), flavor
+
+
+def decode_woff2_fonttools(data):
+    """WOFF2 decoder backed by fontTools (needs the brotli package too)"""
+    from fontTools.ttLib import woff2
+
+    output = io.BytesIO()
+    woff2.decompress(io.BytesIO(data), output)
+    sfnt = output.getvalue()
+    return sfnt, sfnt[:4]
+
+
+def woff2_decoder(spec=WOFF2_AUTO):
+    """Resolve a 'module:function' WOFF2 decoder; 'auto' uses fontTools if it's installed, else None"""
+    if not spec:
+        return None
+    if spec == WOFF2_AUTO:
+        try:
+            importlib.import_module('fontTools.ttLib.woff2')
+            importlib.import_module('brotli')
+        except ImportError:
+            return None
+        spec = FONTTOOLS_WOFF2_DECODER
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def sfnt_extension(flavor):
+    return '.otf' if flavor == b'OTTO' else '.ttf'
+
+
+def decode_file(src_path, dest_stem, woff2_spec=WOFF2_AUTO):
+    """
+    Decode a WOFF/WOFF2 file to dest_stem + '.ttf' (or '.otf' for CFF fonts).
+    Runs in a worker process. Returns {'path', 'size', 'sha256', 'seconds'}.
+    """
+    start = time.perf_counter()
+    with open(src_path, 'rb') as f:
+        data = f.read()
+
+    signature = data[:4]
+    if signature == WOFF_SIGNATURE:
+        sfnt, flavor = decode_woff(data)
+    elif signature == WOFF2_SIGNATURE:
+        decoder = woff2_decoder(woff2_spec)
+        if decoder is None:
+            raise WoffError("No WOFF2 decoder available (install fontTools and brotli)")
+        sfnt, flavor = decoder(data)
+    else:
+        raise WoffError(f"Unknown web font signature {signature!r}")
+
+    dest_path = dest_stem + sfnt_extension(flavor)
+    part_path = dest_path + '.part'
+    with open(part_path, 'wb') as f:
+        f.write(sfnt)
+    os.replace(part_path, dest_path)
+    return {'path': dest_path, 'size': len(sfnt), 'sha256': hashlib.sha256(sfnt).hexdigest(),
+            'seconds': time.perf_counter() - start}
+
+
+class WoffDecoder:
+    """Decodes web fonts on a process pool created on first use"""
+
+    def __init__(self, max_workers=DEFAULT_WOFF_WORKERS, woff2_spec=WOFF2_AUTO):
+        self.max_workers = max_workers
+        self.woff2_spec = woff2_spec
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def can_decode(self, ext):
+        if ext == '.woff':
+            return True
+        if ext == '.woff2':
+            try:
+                return woff2_decoder(self.woff2_spec) is not None
+            except (ImportError, AttributeError):
+                return False
+        return False
+
+    def submit(self, src_path, dest_stem):
+        """Future for decode_file(src_path, dest_stem); decodes inline when max_workers is 0"""
+        if self.max_workers <= 0:
+            from concurrent.futures import Future
+            future = Future()
+            try:
+                future.set_result(decode_file(src_path, dest_stem, self.woff2_spec))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor.submit(decode_file, src_path, dest_stem, self.woff2_spec)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,100 @@
+"""
+Selective ZIP extraction for font archives.
+Reads the central directory, picks only the .ttf/.otf members and streams
+each one straight to its final name. Readmes, licenses, specimen images and
+web kits are never written to disk.
+"""
+
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+# Members at least this big are decompressed on worker threads (zlib releases the GIL)
+PARALLEL_MEMBER_BYTES = 1024 * 1024
+DEFAULT_ZIP_WORKERS = 4
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def font_members(zip_ref):
+    """ZipInfo entries for the installable fonts in an archive, one per file name"""
+    members = []
+    seen_names = set()
+    for info in zip_ref.infolist():
+        if info.is_dir() or '__MACOSX' in info.filename:
+            continue
+        name = os.path.basename(info.filename)
+        if not name.lower().endswith(FONT_EXTENSIONS) or name in seen_names:
+            continue
+        seen_names.add(name)
+        members.append(info)
+    return members
+
+
+def extract_member(zip_ref, info, dest_path):
+    """Stream one member to dest_path. Returns {'path', 'size', 'sha256'}"""
+    part_path = dest_path + '.part'
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with zip_ref.open(info) as source, open(part_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+    except BaseException:
+        try:
+            os.unlink(part_path)
+        except OSError:
+            pass
+        raise
+    os.replace(part_path, dest_path)
+    return {'path': dest_path, 'size': size, 'sha256': sha256.hexdigest()}
+
+
+def _extract_with_own_handle(zip_path, info, dest_path):
+    import zipfile
+
+    # Every worker gets its own file handle so reads don't serialize on one
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return extract_member(zip_ref, info, dest_path)
+
+
+def extract_fonts(zip_path, dest_dir, name_prefix='', max_workers=DEFAULT_ZIP_WORKERS):
+    """
+    Extract only the font members of zip_path into dest_dir as
+    f"{name_prefix}{basename}". Returns a list of {'path', 'size', 'sha256'},
+    in archive order.
+    """
+    import zipfile
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = font_members(zip_ref)
+        targets = [(info, os.path.join(dest_dir, f"{name_prefix}{os.path.basename(info.filename)}"))
+                   for info in members]
+
+        large = [(info, path) for info, path in targets if info.file_size >= PARALLEL_MEMBER_BYTES]
+        if max_workers <= 1 or len(large) < 2:
+            large = []
+
+        results = {}
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers) if large else None
+        try:
+            for info, path in large:
+                futures[info.filename] = executor.submit(_extract_with_own_handle, zip_path, info, path)
+
+            # Small members are cheaper to do inline than to hand off
+            for info, path in targets:
+                if info.filename not in futures:
+                    results[info.filename] = extract_member(zip_ref, info, path)
+
+            for filename, future in futures.items():
+                results[filename] = future.result()
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+    return [results[info.filename] for info, _ in targets]